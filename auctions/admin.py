@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import User, Category, Listing, Bid, Comment, Watchlist
+from .models import User, Category, Listing, Bid, BidArchive, ProxyBid, Comment, WatchlistItem, Notification
 
 
 # Register your models here.
@@ -8,5 +8,8 @@ admin.site.register(User)
 admin.site.register(Category)
 admin.site.register(Listing)
 admin.site.register(Bid)
+admin.site.register(BidArchive)
+admin.site.register(ProxyBid)
 admin.site.register(Comment)
-admin.site.register(Watchlist)
\ No newline at end of file
+admin.site.register(WatchlistItem)
+admin.site.register(Notification)
\ No newline at end of file
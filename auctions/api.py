@@ -0,0 +1,130 @@
+"""
+Read-only JSON API for polling clients. Responses are built from .values()
+rows and carry an ETag (and Last-Modified where exact), so an unchanged
+resource costs one small indexed query and a 304 without a body.
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from .caching import get_category_counts
+from .models import Category, Listing
+from .pagination import InvalidCursor, keyset_page
+
+
+# Fields of listings in feeds, detail adds the rest
+FEED_FIELDS = [
+    "id", "title", "current_bid", "bid_count", "image_url", "closed", "end_time",
+    "creation_date", "update_date"
+]
+FEED_EXPRESSIONS = {
+    "category_name": F("category__name"),
+    "seller_name": F("seller__username")
+}
+
+
+def _error(status, message):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _fingerprint(data):
+    return hashlib.md5(json.dumps(data, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def _conditional(request, etag, get_data, last_modified=None):
+    # Answer 304 if client's copy is current, otherwise build and tag the response
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(get_data())
+
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _feed_values(queryset):
+    return queryset.values(*FEED_FIELDS, **FEED_EXPRESSIONS)
+
+
+@require_GET
+def categories(request):
+    # Counts are cached, so tagging them costs no query
+    categories = get_category_counts()
+    return _conditional(request, _fingerprint(categories), lambda: {"categories": categories})
+
+
+@require_GET
+def listing(request, id):
+    # Check if listing exists, only its update date is needed for a 304
+    update_date = Listing.objects.filter(pk=id).values_list("update_date", flat=True).first()
+    if update_date is None:
+        return _error(404, "The listing does not exist.")
+
+    def get_data():
+        listing = Listing.objects.filter(pk=id).values(
+            *FEED_FIELDS, "description", "starting_bid",
+            highest_bidder_name=F("highest_bidder__username"), winner_name=F("winner__username"),
+            **FEED_EXPRESSIONS
+        ).get()
+        return {"listing": listing}
+
+    # Bids, edits and closing all set update_date
+    return _conditional(request, f"{id}-{update_date.timestamp()}", get_data, update_date)
+
+
+@require_GET
+def listings(request):
+    # Active feed by default, ?closed=1 for closed listings, ?category=<id> to filter
+    closed = request.GET.get("closed") == "1"
+    queryset = Listing.objects.filter(closed=closed)
+    field = "update_date"
+
+    category = request.GET.get("category")
+    if category:
+        if not category.isdigit() or not Category.objects.filter(pk=category).exists():
+            return _error(404, "Category does not exist.")
+        queryset = queryset.filter(category=category)
+        field = "creation_date"
+
+    # Tag the requested page by its rows' ids and update dates, read in one
+    # bounded range scan of the feed's index. A listing entering, changing in
+    # or leaving the page changes them (bids, edits and closes set
+    # update_date). No Last-Modified: a listing leaving the page does not raise
+    # the latest update date of the remaining ones.
+    cursor = request.GET.get("cursor")
+    try:
+        state = keyset_page(queryset.values(*dict.fromkeys(["id", field, "update_date"])), field, cursor)
+    except InvalidCursor:
+        return _error(400, "Invalid page.")
+    etag = f"{'closed' if closed else 'active'}-{category}-{_fingerprint(state)}"
+
+    # The page itself is only queried if changed
+    def get_data():
+        rows, next_cursor = keyset_page(_feed_values(queryset), field, cursor)
+        return {"listings": rows, "next_cursor": next_cursor}
+
+    return _conditional(request, etag, get_data)
+
+
+@require_GET
+def watchlist(request):
+    if not request.user.is_authenticated:
+        return _error(401, "Login required.")
+
+    # Version of watchlist from ids and update dates of its listings only
+    listings = Listing.objects.filter(watchlist_items__user=request.user).order_by("pk")
+    state = list(listings.values_list("pk", "update_date"))
+
+    return _conditional(
+        request, _fingerprint(state), lambda: {"listings": list(_feed_values(listings))}
+    )
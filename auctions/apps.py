@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
 
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        from .database import configure_sqlite
+        from .search import remove_deleted_listing
+
+        connection_created.connect(configure_sqlite, dispatch_uid="auctions.configure_sqlite")
+        post_delete.connect(remove_deleted_listing, sender="auctions.Listing", dispatch_uid="auctions.remove_deleted_listing")
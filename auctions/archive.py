@@ -0,0 +1,92 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Bid, BidArchive, Listing
+
+
+# Listings closed longer than this many days have their bids archived
+DEFAULT_ARCHIVE_AFTER_DAYS = 30
+
+# Number of listings archived per transaction
+DEFAULT_BATCH_SIZE = 200
+
+
+def archivable_listings(before):
+    """
+    Listings closed before the cutoff with more than their winning bid inline,
+    from stored counts only: bid_count includes archived bids, so a listing
+    whose archive holds all but one of them is done. No bids are counted.
+    """
+    return (
+        Listing.objects.filter(closed=True, update_date__lt=before, bid_count__gt=1)
+        .exclude(bid_archive__bid_count=F("bid_count") - 1)
+    )
+
+
+def archive_bids_batch(before, batch_size=DEFAULT_BATCH_SIZE, after=0):
+    """
+    Move all but the highest bid of up to batch_size listings closed before
+    `before` with a pk above `after` into their BidArchive row, return the
+    pks of the listings archived. The highest bid stays in the Bid table so
+    the winner and current bid are still backed by a row, and stored
+    bid_count is unchanged.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        ids = list(
+            archivable_listings(before).filter(pk__gt=after).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+
+        # Bids of the batch, highest first per listing (bid_listing_amount_idx)
+        bids = defaultdict(list)
+        rows = (
+            Bid.objects.filter(listing__in=ids)
+            .order_by("listing", "-bid_amount", "-pk")
+            .values_list("pk", "listing", "bidder", "bid_amount", "bid_date")
+        )
+        for row in rows:
+            bids[row[1]].append(row)
+
+        # Append losing bids to existing archives or create new ones
+        archives = {archive.listing_id: archive for archive in BidArchive.objects.filter(listing__in=ids)}
+        new_archives = []
+        archived_ids = []
+        for listing_id, listing_bids in bids.items():
+            losing = listing_bids[1:]
+            archived_ids.extend(pk for pk, *_ in losing)
+
+            archive = archives.get(listing_id)
+            if archive is None:
+                archive = BidArchive(listing_id=listing_id)
+                new_archives.append(archive)
+            archive.bid_count += len(losing)
+            archive.archive_date = now
+            archive.bids += [
+                [bidder, str(amount), date.isoformat()] for _, _, bidder, amount, date in losing
+            ]
+
+        BidArchive.objects.bulk_create(new_archives)
+        BidArchive.objects.bulk_update(archives.values(), ["bid_count", "bids", "archive_date"])
+        Bid.objects.filter(pk__in=archived_ids).delete()
+
+    return ids
+
+
+def archive_bids(days=DEFAULT_ARCHIVE_AFTER_DAYS, now=None, batch_size=DEFAULT_BATCH_SIZE):
+    # Archive batches in pk order until no archivable listings are left, return total archived
+    before = (now or timezone.now()) - timedelta(days=days)
+    total = 0
+    after = 0
+    while True:
+        ids = archive_bids_batch(before, batch_size, after)
+        if not ids:
+            return total
+        total += len(ids)
+        after = ids[-1]
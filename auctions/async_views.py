@@ -0,0 +1,209 @@
+"""
+Async versions of the read-only views, routed instead of their counterparts
+in auctions.views when settings.ASYNC_VIEWS is on (ASGI deployment). They use
+the async ORM so requests are not wrapped in sync_to_async as a whole.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+
+from .caching import aget_category_counts, aget_watchlist_count, alisting_fragments
+from .forms import NewBidForm, NewCommentForm, NewProxyBidForm
+from .models import Category, Listing, Comment, WatchlistItem
+from .pagination import InvalidCursor, akeyset_page, get_comments_page_size
+
+
+async def _get_user(request):
+    # Resolve lazy request.user (and session) once, later accesses are cached
+    user = await sync_to_async(get_user)(request)
+
+    # Count watchlist badge now, rendering the nav bar must not query (or read
+    # a cached count that may have expired) inside the event loop
+    if user.is_authenticated:
+        request.watchlist_count = await aget_watchlist_count(user)
+
+    return user
+
+
+async def categories(request):
+    await _get_user(request)
+
+    # Return all categories with their active listing counts in categories page
+    return render(request, "auctions/categories.html", {
+        "categories": await aget_category_counts()
+    })
+
+
+async def category(request, category_id):
+    await _get_user(request)
+
+    # Get category
+    try:
+        category = await Category.objects.aget(pk=category_id)
+
+    except Category.DoesNotExist:
+        return render(request, "auctions/error.html", {
+            "code": 404,
+            "message": "Category does not exist."
+        })
+
+    # Get one page of active listings in category ordered by creation date
+    try:
+        listings, next_cursor = await akeyset_page(
+            Listing.objects.for_feed().filter(category=category_id, closed=False),
+            "creation_date",
+            request.GET.get("cursor")
+        )
+
+    except InvalidCursor:
+        return render(request, "auctions/error.html", {
+            "code": 400,
+            "message": "Invalid page."
+        })
+
+    # Return category page with it's listings
+    return render(request, "auctions/category.html", {
+        "category": category,
+        "listings": listings,
+        "next_cursor": next_cursor
+    })
+
+
+async def closed(request):
+    await _get_user(request)
+
+    # Get one page of closed listings, last updated first
+    try:
+        listings, next_cursor = await akeyset_page(
+            Listing.objects.for_feed().filter(closed=True),
+            "update_date",
+            request.GET.get("cursor")
+        )
+
+    except InvalidCursor:
+        return render(request, "auctions/error.html", {
+            "code": 400,
+            "message": "Invalid page."
+        })
+
+    return render(request, "auctions/index.html", {
+        "listings": listings,
+        "next_cursor": next_cursor,
+        "closed": True
+    })
+
+
+async def index(request):
+    await _get_user(request)
+
+    # Get one page of active listings, last updated first
+    try:
+        listings, next_cursor = await akeyset_page(
+            Listing.objects.for_feed().filter(closed=False),
+            "update_date",
+            request.GET.get("cursor")
+        )
+
+    except InvalidCursor:
+        return render(request, "auctions/error.html", {
+            "code": 400,
+            "message": "Invalid page."
+        })
+
+    return render(request, "auctions/index.html", {
+        "listings": listings,
+        "next_cursor": next_cursor
+    })
+
+
+async def listing(request, id):
+    user = await _get_user(request)
+
+    # Check if listing exists
+    try:
+        listing = await Listing.objects.select_related("seller", "category", "highest_bidder").aget(pk=id)
+
+    except Listing.DoesNotExist:
+        return render(request, "auctions/error.html", {
+            "code": 404,
+            "message": "The listing does not exist."
+        })
+
+    # Set defaults for watchlist and bid
+    watching = False
+    bid_count = 0
+    highest_bidder = None
+    current_bid = False
+    winner = False
+
+    # Check if listing in watchlist
+    if user.is_authenticated and await WatchlistItem.objects.filter(user=user, listing=listing).aexists():
+        watching = True
+
+    # Check if bids exist
+    if user.is_authenticated and listing.bid_count:
+        # Get bid count
+        bid_count = listing.bid_count
+
+        # Check if highest bid is user's
+        highest_bidder = listing.highest_bidder
+        if listing.highest_bidder_id == user.pk:
+            current_bid = True
+
+            # Check if auction is closed
+            if listing.closed:
+                winner = True
+
+    # Get shared parts of listing page from cache, first page of comments is only queried on a miss
+    async def listing_context():
+        return {"listing": listing}
+
+    async def comments_context():
+        comments, next_cursor = await akeyset_page(
+            Comment.objects.filter(listing=listing).select_related("user"), "date", None, get_comments_page_size()
+        )
+        return {"comments": comments, "next_cursor": next_cursor, "listing_id": listing.pk}
+
+    fragments = await alisting_fragments(listing.pk, {
+        "body": ("auctions/listing_body.html", listing_context),
+        "bids": ("auctions/listing_bids.html", listing_context),
+        "details": ("auctions/listing_details.html", listing_context),
+        "comments": ("auctions/listing_comments.html", comments_context)
+    })
+
+    # Return listing page
+    return render(request, "auctions/listing.html", {
+        "listing": listing,
+        "watching": watching,
+        "bid_count": bid_count,
+        "highest_bidder": highest_bidder,
+        "current_bid": current_bid,
+        "bid_form": NewBidForm(),
+        "proxy_form": NewProxyBidForm(),
+        "winner": winner,
+        "comment_form": NewCommentForm(),
+        "fragments": fragments
+    })
+
+
+async def watchlist(request):
+    user = await _get_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path(), "login")
+
+    # Get listings in watchlist, last added first
+    listings = [
+        listing async for listing in
+        Listing.objects.for_feed()
+        .filter(watchlist_items__user=user)
+        .order_by("-watchlist_items__added_date")
+    ]
+
+    # Return watchlist page with listings
+    return render(request, "auctions/watchlist.html", {
+        "listings": listings,
+        "count": len(listings),
+        "watchlist": True
+    })
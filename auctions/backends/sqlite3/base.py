@@ -0,0 +1,14 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend whose transactions take the write lock when they begin,
+    like the transaction_mode="IMMEDIATE" option of Django 5.1. A deferred
+    transaction that reads before writing (every bid) fails with "database is
+    locked" when another connection wrote in between, without waiting for
+    busy_timeout; an immediate one waits for the lock up front instead.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .caching import bump_listing_version, invalidate_seller_stats
+from .events import BID, publish_listing_event
+from .models import Listing, Bid, BidArchive, ProxyBid
+from .notifications import notify_outbid
+
+
+# Bid placement outcomes
+PLACED = "PLACED"
+NOT_FOUND = "NOT_FOUND"
+CLOSED = "CLOSED"
+BELOW_STARTING = "BELOW_STARTING"
+NOT_HIGHER = "NOT_HIGHER"
+
+
+@dataclass
+class BidResult:
+    status: str
+    message: str
+    bid: Bid = None
+
+    @property
+    def success(self):
+        return self.status == PLACED
+
+
+# Minimum raise of proxy bids by current price: (price below, increment)
+BID_INCREMENTS = [
+    (Decimal("1.00"), Decimal("0.05")),
+    (Decimal("5.00"), Decimal("0.25")),
+    (Decimal("25.00"), Decimal("0.50")),
+    (Decimal("100.00"), Decimal("1.00")),
+    (Decimal("250.00"), Decimal("2.50")),
+    (Decimal("500.00"), Decimal("5.00")),
+    (Decimal("1000.00"), Decimal("10.00")),
+    (Decimal("2500.00"), Decimal("25.00")),
+    (Decimal("5000.00"), Decimal("50.00")),
+]
+MAX_INCREMENT = Decimal("100.00")
+
+
+def bid_increment(price):
+    for below, increment in BID_INCREMENTS:
+        if price < below:
+            return increment
+    return MAX_INCREMENT
+
+
+def _lock_open_listing(listing_id, now):
+    # Locked listing row, or the BidResult rejecting any bid on it
+    try:
+        listing = Listing.objects.select_for_update().get(pk=listing_id)
+
+    except Listing.DoesNotExist:
+        return None, BidResult(NOT_FOUND, "The listing does not exist.")
+
+    # Check if listing is closed or its auction has ended
+    if listing.closed or (listing.end_time and listing.end_time <= now):
+        return None, BidResult(CLOSED, "Listing is closed, placing a bid is not possible.")
+
+    return listing, None
+
+
+def _beats(listing, amount):
+    # Whether amount may become the current bid of listing
+    return amount > listing.current_bid or (listing.bid_count == 0 and amount >= listing.starting_bid)
+
+
+def _raise_bid(listing, bidder, amount, now):
+    """
+    Make bidder the highest bidder of the locked listing at amount and return
+    the new Bid, or None if amount is not higher than the current bid at the
+    time of the write. Keeps the in-memory listing in sync with the row.
+    """
+    # Raise current bid only if listing is still open and the bid is the first
+    # one or higher than the current bid at the time of the write
+    updated = Listing.objects.filter(
+        Q(current_bid__lt=amount) | Q(bid_count=0),
+        Q(end_time__isnull=True) | Q(end_time__gt=now),
+        pk=listing.pk,
+        closed=False
+    ).update(
+        current_bid=amount,
+        bid_count=F("bid_count") + 1,
+        highest_bidder=bidder,
+        update_date=now
+    )
+
+    if not updated:
+        return None
+
+    # Save new bid, previous highest bidder is told later by the outbox worker
+    new_bid = Bid.objects.create(listing=listing, bidder=bidder, bid_amount=amount)
+    if listing.highest_bidder_id and listing.highest_bidder_id != bidder.pk:
+        notify_outbid(listing.highest_bidder_id, listing.pk, amount)
+
+    listing.current_bid = amount
+    listing.bid_count += 1
+    listing.highest_bidder = bidder
+    return new_bid
+
+
+def _resolve_proxies(listing, now):
+    """
+    Let proxy bids answer the current bid of the locked listing, computed from
+    the two highest proxies only: the runner-up bids its maximum, the top proxy
+    bids one increment above it (capped at its own maximum). Places at most two
+    bids, however many proxies compete.
+    """
+    proxies = list(
+        ProxyBid.objects.filter(listing=listing).select_related("user").order_by("-max_amount", "update_date")[:2]
+    )
+    if not proxies:
+        return
+
+    top = proxies[0]
+    runner_up = proxies[1].max_amount if len(proxies) > 1 else None
+
+    # Runner-up proxy bids its maximum, unless the top proxy has the same (earlier proxy wins)
+    if runner_up is not None and runner_up < top.max_amount and _beats(listing, runner_up):
+        _raise_bid(listing, proxies[1].user, runner_up, now)
+
+    # Top proxy already has the current bid, and a tied runner-up cannot raise it
+    if listing.bid_count and listing.highest_bidder_id == top.user_id and not (
+        runner_up is not None and _beats(listing, runner_up)
+    ):
+        return
+
+    # Top proxy bids one increment above current bid (or the runner-up), at most its maximum
+    amount = listing.current_bid + bid_increment(listing.current_bid) if listing.bid_count else listing.starting_bid
+    amount = min(top.max_amount, max(amount, runner_up or amount))
+    if _beats(listing, amount):
+        _raise_bid(listing, top.user, amount, now)
+
+
+def _committed(listing):
+    # Invalidate cached listing page and seller stats, notify open pages once the bids are committed
+    current_bid = listing.current_bid
+    bid_count = listing.bid_count
+    bidder = listing.highest_bidder.username
+
+    def committed():
+        bump_listing_version(listing.pk)
+        invalidate_seller_stats(listing.seller_id)
+        publish_listing_event(listing.pk, BID, current_bid=current_bid, bid_count=bid_count, bidder=bidder)
+
+    transaction.on_commit(committed)
+
+
+def place_bid(listing_id, bidder, amount):
+    """
+    Validate and apply a bid in a single transaction. The listing row is locked
+    while it is checked, and current_bid is only raised by a conditional UPDATE,
+    so concurrent bids can never overwrite a higher bid with a lower one even on
+    databases without row locks (SQLite). The same UPDATE maintains the
+    listing's bid_count and highest_bidder. Proxy bids of other users answer
+    the bid in the same transaction.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Lock listing row until the bid is saved
+        listing, rejected = _lock_open_listing(listing_id, now)
+        if rejected:
+            return rejected
+
+        # Bid is lower than starting bid
+        if amount < listing.starting_bid:
+            return BidResult(BELOW_STARTING, "Bid must be at least as large as starting bid.")
+
+        new_bid = _raise_bid(listing, bidder, amount, now)
+        if not new_bid:
+            return BidResult(NOT_HIGHER, "Bid must be higher than current bid.")
+
+        _resolve_proxies(listing, now)
+        _committed(listing)
+
+    if listing.highest_bidder_id != bidder.pk:
+        return BidResult(PLACED, "Bid placed, but another bidder's maximum bid is higher.", new_bid)
+
+    return BidResult(PLACED, "Successfully placed bid.", new_bid)
+
+
+def set_max_bid(listing_id, bidder, max_amount):
+    """
+    Store the maximum bidder is willing to pay for a listing and let the proxy
+    bids of all users resolve in the same transaction. Bids are then placed on
+    the bidder's behalf, one increment above competing bids, up to max_amount.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        listing, rejected = _lock_open_listing(listing_id, now)
+        if rejected:
+            return rejected
+
+        # Maximum is lower than starting bid
+        if max_amount < listing.starting_bid:
+            return BidResult(BELOW_STARTING, "Maximum bid must be at least as large as starting bid.")
+
+        # Maximum must beat current bid, unless it is the bidder's own
+        if listing.bid_count and max_amount <= listing.current_bid and not (
+            listing.highest_bidder_id == bidder.pk and max_amount == listing.current_bid
+        ):
+            return BidResult(NOT_HIGHER, "Maximum bid must be higher than current bid.")
+
+        ProxyBid.objects.update_or_create(listing=listing, user=bidder, defaults={"max_amount": max_amount})
+
+        bid_count = listing.bid_count
+        _resolve_proxies(listing, now)
+        if listing.bid_count != bid_count:
+            _committed(listing)
+
+    if listing.highest_bidder_id != bidder.pk:
+        return BidResult(PLACED, "Maximum bid saved, but another bidder's maximum bid is higher.")
+
+    return BidResult(PLACED, f"Maximum bid saved, your bid is ${listing.current_bid}.")
+
+
+def _actual_bid_aggregates():
+    # Bid count and highest bidder per listing computed from the Bid table,
+    # archived bids only count (the highest bid is never archived)
+    bids = Bid.objects.filter(listing=OuterRef("pk"))
+    archived = BidArchive.objects.filter(listing=OuterRef("pk")).values("bid_count")
+    return {
+        "actual_bid_count": (
+            Coalesce(Subquery(bids.values("listing").annotate(count=Count("pk")).values("count")), 0)
+            + Coalesce(Subquery(archived), 0)
+        ),
+        "actual_highest_bidder": Subquery(bids.order_by("-bid_amount", "-pk").values("bidder")[:1])
+    }
+
+
+def inconsistent_bid_aggregates(queryset=None):
+    # Listings whose stored bid_count or highest_bidder disagree with their bids
+    queryset = Listing.objects.all() if queryset is None else queryset
+    aggregates = _actual_bid_aggregates()
+    return queryset.annotate(
+        actual_bid_count=aggregates["actual_bid_count"],
+        stored_highest_bidder=Coalesce("highest_bidder", 0, output_field=IntegerField()),
+        actual_highest_bidder=Coalesce(aggregates["actual_highest_bidder"], 0, output_field=IntegerField())
+    ).filter(
+        ~Q(bid_count=F("actual_bid_count")) | ~Q(stored_highest_bidder=F("actual_highest_bidder"))
+    )
+
+
+def backfill_bid_aggregates(queryset=None):
+    # Recompute stored aggregates from bids in a single UPDATE, return row count
+    queryset = Listing.objects.all() if queryset is None else queryset
+    aggregates = _actual_bid_aggregates()
+    return queryset.update(
+        bid_count=aggregates["actual_bid_count"],
+        highest_bidder=aggregates["actual_highest_bidder"]
+    )
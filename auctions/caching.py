@@ -0,0 +1,236 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import Bid, Category, Listing, WatchlistItem
+
+
+# Seconds a rendered listing fragment stays cached, overridable via settings
+DEFAULT_FRAGMENT_TIMEOUT = 300
+
+FRAGMENT_STATS_KEYS = {
+    "hits": "listing_fragments:hits",
+    "misses": "listing_fragments:misses",
+}
+
+
+def _incr(key, delta=1):
+    # Increment counter, creating it if missing or evicted
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key, delta)
+
+
+async def _aincr(key, delta=1):
+    try:
+        return await cache.aincr(key, delta)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        return await cache.aincr(key, delta)
+
+
+def _version_key(listing_id):
+    return f"listing:{listing_id}:version"
+
+
+def get_listing_version(listing_id):
+    # Start from current time so an evicted counter never reuses old fragments
+    version = cache.get(_version_key(listing_id))
+    if version is None:
+        cache.add(_version_key(listing_id), time.time_ns(), None)
+        version = cache.get(_version_key(listing_id))
+    return version
+
+
+async def aget_listing_version(listing_id):
+    version = await cache.aget(_version_key(listing_id))
+    if version is None:
+        await cache.aadd(_version_key(listing_id), time.time_ns(), None)
+        version = await cache.aget(_version_key(listing_id))
+    return version
+
+
+def bump_listing_version(listing_id):
+    # Invalidate all cached fragments of listing
+    return _incr(_version_key(listing_id))
+
+
+def _fragment_timeout():
+    return getattr(settings, "LISTING_FRAGMENT_TIMEOUT", DEFAULT_FRAGMENT_TIMEOUT)
+
+
+def _fragment_stats(hits, misses):
+    # Counter updates per view, not per fragment
+    return [(FRAGMENT_STATS_KEYS[name], count) for name, count in [("hits", hits), ("misses", misses)] if count]
+
+
+def listing_fragments(listing_id, fragments):
+    """
+    Return rendered templates of the shared (not user specific) parts of the
+    listing page by name, cached until the listing's version is bumped.
+    fragments maps names to (template, context) pairs. Contexts may be lazy
+    (e.g. an unevaluated queryset) or functions returning them, so cache hits
+    cost no queries. All fragments are read in one cache round trip.
+    """
+    prefix = f"listing:{listing_id}:{get_listing_version(listing_id)}:"
+    cached = cache.get_many([prefix + name for name in fragments])
+
+    rendered, missed = {}, {}
+    for name, (template, context) in fragments.items():
+        html = cached.get(prefix + name)
+        if html is None:
+            html = missed[prefix + name] = render_to_string(template, context() if callable(context) else context)
+        rendered[name] = mark_safe(html)
+
+    if missed:
+        cache.set_many(missed, _fragment_timeout())
+    for key, count in _fragment_stats(len(fragments) - len(missed), len(missed)):
+        _incr(key, count)
+    return rendered
+
+
+async def alisting_fragments(listing_id, fragments):
+    # Async version of listing_fragments, contexts are only built (awaited) on a miss
+    prefix = f"listing:{listing_id}:{await aget_listing_version(listing_id)}:"
+    cached = await cache.aget_many([prefix + name for name in fragments])
+
+    rendered, missed = {}, {}
+    for name, (template, get_context) in fragments.items():
+        html = cached.get(prefix + name)
+        if html is None:
+            html = missed[prefix + name] = render_to_string(template, await get_context())
+        rendered[name] = mark_safe(html)
+
+    if missed:
+        await cache.aset_many(missed, _fragment_timeout())
+    for key, count in _fragment_stats(len(fragments) - len(missed), len(missed)):
+        await _aincr(key, count)
+    return rendered
+
+
+def fragment_cache_stats():
+    stats = cache.get_many(FRAGMENT_STATS_KEYS.values())
+    return {name: stats.get(key, 0) for name, key in FRAGMENT_STATS_KEYS.items()}
+
+
+CATEGORY_COUNTS_KEY = "categories:active_counts"
+
+# Seconds category counts stay cached, so counts that missed an invalidation
+# (e.g. by a command using another cache) are corrected eventually
+DEFAULT_CATEGORY_COUNTS_TIMEOUT = 300
+
+
+def _category_counts_timeout():
+    return getattr(settings, "CATEGORY_COUNTS_TIMEOUT", DEFAULT_CATEGORY_COUNTS_TIMEOUT)
+
+
+def get_category_counts():
+    # Categories with their number of active listings, queried only on a cache miss
+    categories = cache.get(CATEGORY_COUNTS_KEY)
+    if categories is None:
+        categories = list(Category.objects.with_active_counts().order_by("pk").values("pk", "name", "active_count"))
+        cache.set(CATEGORY_COUNTS_KEY, categories, _category_counts_timeout())
+    return categories
+
+
+async def aget_category_counts():
+    categories = await cache.aget(CATEGORY_COUNTS_KEY)
+    if categories is None:
+        categories = [
+            category async for category in
+            Category.objects.with_active_counts().order_by("pk").values("pk", "name", "active_count")
+        ]
+        await cache.aset(CATEGORY_COUNTS_KEY, categories, _category_counts_timeout())
+    return categories
+
+
+def invalidate_category_counts():
+    cache.delete(CATEGORY_COUNTS_KEY)
+
+
+# Seconds a watchlist count stays cached, so a count adjusted in another cache
+# (or left stale by a cascade delete) is recounted eventually
+DEFAULT_WATCHLIST_COUNT_TIMEOUT = 600
+
+
+def _watchlist_count_timeout():
+    return getattr(settings, "WATCHLIST_COUNT_TIMEOUT", DEFAULT_WATCHLIST_COUNT_TIMEOUT)
+
+
+def _watchlist_count_key(user_id):
+    return f"user:{user_id}:watchlist_count"
+
+
+def get_watchlist_count(user):
+    # Number of listings in user's watchlist, counted only on a cache miss
+    count = cache.get(_watchlist_count_key(user.pk))
+    if count is None:
+        count = user.get_watchlist_items()
+        cache.set(_watchlist_count_key(user.pk), count, _watchlist_count_timeout())
+    return count
+
+
+async def aget_watchlist_count(user):
+    count = await cache.aget(_watchlist_count_key(user.pk))
+    if count is None:
+        count = await WatchlistItem.objects.filter(user=user).acount()
+        await cache.aset(_watchlist_count_key(user.pk), count, _watchlist_count_timeout())
+    return count
+
+
+def adjust_watchlist_count(user_id, delta):
+    # Update cached count in place (keeping its timeout), a missing count is recomputed on next read
+    try:
+        cache.incr(_watchlist_count_key(user_id), delta)
+    except ValueError:
+        pass
+
+
+# Seconds seller stats stay cached without bids or closes, so recent bids age out
+DEFAULT_SELLER_STATS_TIMEOUT = 300
+
+# Top listings by bid count on the seller dashboard
+SELLER_TOP_LISTINGS = 10
+
+# Days counted as recent bids on the seller dashboard
+SELLER_RECENT_DAYS = 7
+
+
+def _seller_stats_key(seller_id):
+    return f"seller:{seller_id}:stats"
+
+
+def get_seller_stats(seller_id):
+    """
+    Return dashboard stats of a seller's listings, queried only on a cache
+    miss: one aggregate over the seller's listings, one count of their recent
+    bids and the top listings from the (seller, -bid_count) index. Totals come
+    from the listings' stored bid aggregates, so archived bids are included.
+    """
+    stats = cache.get(_seller_stats_key(seller_id))
+    if stats is None:
+        listings = Listing.objects.filter(seller=seller_id)
+        stats = listings.seller_stats()
+        stats["recent_bid_count"] = Bid.objects.filter(
+            listing__seller=seller_id, bid_date__gte=timezone.now() - timedelta(days=SELLER_RECENT_DAYS)
+        ).count()
+        stats["top_listings"] = list(
+            listings.filter(bid_count__gt=0).order_by("-bid_count", "-pk")
+            .values("id", "title", "bid_count", "current_bid", "closed")[:SELLER_TOP_LISTINGS]
+        )
+        cache.set(
+            _seller_stats_key(seller_id), stats,
+            getattr(settings, "SELLER_STATS_TIMEOUT", DEFAULT_SELLER_STATS_TIMEOUT)
+        )
+    return stats
+
+
+def invalidate_seller_stats(*seller_ids):
+    cache.delete_many([_seller_stats_key(seller_id) for seller_id in seller_ids])
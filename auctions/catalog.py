@@ -0,0 +1,163 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .caching import invalidate_category_counts, invalidate_seller_stats
+from .forms import NewListingForm
+from .models import Category, Listing
+from .search import get_search_backend
+
+
+# Number of listings inserted per transaction on import
+DEFAULT_BATCH_SIZE = 500
+
+# Number of rows fetched from the database at a time on export
+DEFAULT_CHUNK_SIZE = 2000
+
+FORMATS = ["csv", "jsonl"]
+
+# Columns written on export, import reads the NewListingForm fields among them
+EXPORT_FIELDS = [
+    "id", "title", "description", "starting_bid", "current_bid", "image_url", "category",
+    "seller", "closed", "end_time", "creation_date"
+]
+
+
+def guess_format(path):
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(file, format):
+    # Yield (line number, row dict) one at a time, never reading the whole file
+    if format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+
+def _form_data(row, categories):
+    data = {field: row.get(field) for field in NewListingForm.Meta.fields}
+    data = {field: "" if value is None else value for field, value in data.items()}
+
+    # Category may be given by name (as exported) or by id
+    category = str(data["category"]).strip()
+    if category and not category.isdigit():
+        data["category"] = categories.get(category.lower(), category)
+
+    return data
+
+
+def _insert(listings):
+    # Insert one batch, index it for search and count it only if it commits
+    with transaction.atomic():
+        created = Listing.objects.bulk_create(listings)
+        backend = get_search_backend()
+        for listing in created:
+            backend.index(listing)
+    return len(created)
+
+
+def import_listings(file, seller, format="csv", batch_size=DEFAULT_BATCH_SIZE, on_error=None):
+    """
+    Create listings of seller from a CSV or JSON Lines file, validating every
+    row with NewListingForm. Valid rows are inserted with bulk_create in
+    batches of batch_size, one transaction per batch, so memory use does not
+    grow with the file. Invalid rows are skipped and reported, together with
+    their line number, in the returned ImportResult and to on_error.
+    """
+    result = ImportResult()
+    categories = {name.lower(): pk for pk, name in Category.objects.values_list("pk", "name")}
+    batch = []
+    line = 0
+
+    def error(line, message):
+        result.add_error(line, message)
+        if on_error:
+            on_error(line, message)
+
+    try:
+        for line, row in read_rows(file, format):
+            if not isinstance(row, dict):
+                error(line, "Row is not a JSON object.")
+                continue
+
+            # Validate row the same way as a listing created on the site
+            form = NewListingForm(_form_data(row, categories))
+            if not form.is_valid():
+                message = "; ".join(
+                    f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()
+                )
+                error(line, message)
+                continue
+
+            listing = form.save(commit=False)
+            listing.seller = seller
+            listing.current_bid = listing.starting_bid
+            listing.image_pending = bool(listing.image_url)
+            batch.append(listing)
+
+            if len(batch) >= batch_size:
+                result.created += _insert(batch)
+                batch = []
+
+    except csv.Error as e:
+        # Malformed CSV, rows read so far are still imported
+        error(line + 1, f"Unreadable row, import stopped: {e}")
+
+    if batch:
+        result.created += _insert(batch)
+
+    if result.created:
+        invalidate_category_counts()
+        invalidate_seller_stats(seller.pk)
+
+    return result
+
+
+def export_rows(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Yield listings as dicts of EXPORT_FIELDS, chunk_size rows in memory at a time
+    queryset = Listing.objects.all() if queryset is None else queryset
+    rows = queryset.order_by("pk").values(
+        "id", "title", "description", "starting_bid", "current_bid", "image_url",
+        "category__name", "seller__username", "closed", "end_time", "creation_date"
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        row["category"] = row.pop("category__name")
+        row["seller"] = row.pop("seller__username")
+        yield row
+
+
+def export_listings(file, format="csv", queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Write listings to file as CSV or JSON Lines, return number written
+    count = 0
+    if format == "csv":
+        writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for row in export_rows(queryset, chunk_size):
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in export_rows(queryset, chunk_size):
+            file.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+            count += 1
+
+    return count
@@ -0,0 +1,17 @@
+from functools import partial
+
+from .caching import get_watchlist_count
+
+
+def watchlist_count(request):
+    # Watchlist badge count, only looked up if a template renders it
+    if not request.user.is_authenticated:
+        return {}
+
+    # Counted beforehand by the async views
+    if hasattr(request, "watchlist_count"):
+        return {"watchlist_count": request.watchlist_count}
+
+    return {
+        "watchlist_count": partial(get_watchlist_count, request.user)
+    }
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger("auctions.events")
+
+# Events buffered per subscriber before the oldest are dropped
+QUEUE_SIZE = 100
+
+# Event types pushed to listing pages
+BID = "bid"
+CLOSE = "close"
+COMMENT = "comment"
+
+
+class Subscription:
+    """
+    Queue of events of one channel for one client, registered with the broker
+    while used as an async context manager.
+    """
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.loop = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.broker.register(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.unregister(self)
+
+    def offer(self, event):
+        # Called on the subscriber's event loop, slow clients lose oldest events
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        # Next event, raises asyncio.TimeoutError if none arrives in time
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InProcessBroker:
+    """
+    Fans events out to subscriptions of the current process. publish() may be
+    called from any thread, e.g. sync views run in a thread pool under ASGI.
+    Brokers for multi-process deployments (e.g. Redis pub/sub) implement the
+    same publish/subscribe interface and are set via settings.EVENT_BROKER.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def register(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.channel].add(subscription)
+
+    def unregister(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.channel]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.channel]
+
+    def subscribe(self, channel):
+        return Subscription(self, channel)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Subscriber's event loop is already closed
+                logger.debug("Dropped event for closed subscription on %s", channel)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, "EVENT_BROKER", "auctions.events.InProcessBroker"))()
+
+
+def listing_channel(listing_id):
+    return f"listing:{listing_id}"
+
+
+def publish_listing_event(listing_id, type, **data):
+    # Event carries everything pages need so subscribers never re-query the DB
+    get_broker().publish(listing_channel(listing_id), {"type": type, "data": data})
+
+
+def format_event(event):
+    # Server-sent event wire format
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], cls=DjangoJSONEncoder)}\n\n"
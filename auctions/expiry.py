@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import bump_listing_version, invalidate_category_counts, invalidate_seller_stats
+from .events import CLOSE, publish_listing_event
+from .models import Listing
+from .notifications import notify_won
+
+
+# Number of listings closed per transaction
+DEFAULT_BATCH_SIZE = 500
+
+
+def close_expired_batch(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Close one batch of open listings whose end_time has passed and return the
+    number closed. Rows locked by another worker are skipped, and the UPDATE
+    only touches still open listings, so concurrent or repeated runs never
+    close a listing twice.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        # Claim a batch of expired listings not locked by another worker
+        rows = list(
+            Listing.objects.select_for_update(skip_locked=True)
+            .filter(closed=False, end_time__lte=now)
+            .order_by("end_time")
+            .values_list("pk", "seller")[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [id for id, _ in rows]
+
+        # Close whole batch in one statement, highest bidder (if any) wins
+        closed = Listing.objects.filter(pk__in=ids, closed=False).update(
+            closed=True,
+            winner=F("highest_bidder"),
+            update_date=now
+        )
+
+        # Queue emails to winners in the same transaction
+        notify_won(
+            Listing.objects.filter(pk__in=ids, winner__isnull=False).values_list("pk", "winner", "current_bid")
+        )
+
+        # Invalidate cached listing pages and seller stats once committed. Open
+        # pages only get the close event if EVENT_BROKER reaches across
+        # processes, the in-process default has no subscribers in a worker.
+        def invalidate():
+            for id in ids:
+                bump_listing_version(id)
+                publish_listing_event(id, CLOSE)
+            invalidate_category_counts()
+            invalidate_seller_stats(*{seller for _, seller in rows})
+
+        transaction.on_commit(invalidate)
+
+    return closed
+
+
+def close_expired_auctions(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    # Close batches until no expired listings are left, return total closed
+    now = now or timezone.now()
+    total = 0
+    while True:
+        closed = close_expired_batch(now, batch_size)
+        if not closed:
+            return total
+        total += closed
@@ -1,12 +1,15 @@
-from django.forms import ModelForm
+from django.forms import DateTimeInput, ModelForm
 
-from .models import Listing, Bid, Comment
+from .models import Listing, Bid, Comment, ProxyBid
 
 
 class NewListingForm(ModelForm):
     class Meta:
         model = Listing
-        fields = ["title", "description", "starting_bid", "image_url", "category"]
+        fields = ["title", "description", "starting_bid", "image_url", "category", "end_time"]
+        widgets = {
+            "end_time": DateTimeInput(attrs={"type": "datetime-local"})
+        }
 
 
 class NewBidForm(ModelForm):
@@ -23,6 +26,20 @@ class NewBidForm(ModelForm):
         self.fields["bid_amount"].widget.attrs["placeholder"] = "Bid"
 
 
+class NewProxyBidForm(ModelForm):
+    class Meta:
+        model = ProxyBid
+        fields = ["max_amount"]
+        labels = {
+            "max_amount": ""
+        }
+
+    def __init__(self, *args, **kwargs):
+        super(NewProxyBidForm, self).__init__(*args, **kwargs)
+
+        self.fields["max_amount"].widget.attrs["placeholder"] = "Maximum bid"
+
+
 class NewCommentForm(ModelForm):
     class Meta:
         model = Comment
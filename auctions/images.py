@@ -0,0 +1,260 @@
+import hashlib
+import ipaddress
+import logging
+import os
+import socket
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from .caching import bump_listing_version
+from .models import Listing
+
+
+logger = logging.getLogger("auctions.images")
+
+# Bounding box (px) of every thumbnail generated per image
+THUMBNAIL_SIZES = {
+    "small": (240, 240),
+    "large": (640, 640)
+}
+
+# Defaults of settings.IMAGE_CACHE_MAX_BYTES, IMAGE_FETCH_TIMEOUT and IMAGE_MAX_BYTES
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_FETCH_TIMEOUT = 5
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+# Number of queued listings read per query by cache_pending_images
+DEFAULT_BATCH_SIZE = 100
+
+
+class ImageError(Exception):
+    pass
+
+
+class ImageCache:
+    """
+    Thumbnails on disk, named by the SHA-256 of their source image, so an image
+    used by several listings is stored once and a file never changes. When the
+    total size exceeds max_bytes the least recently served files are evicted.
+    The size is counted once and then tracked by the process storing
+    thumbnails (the cache_listing_images worker), so the directory is only
+    walked again when it is over the limit.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = None
+
+    def path(self, key, name):
+        return os.path.join(self.directory, key[:2], f"{key}-{name}.jpg")
+
+    def get(self, key, name):
+        # Path of cached thumbnail or None, marks it as recently used
+        path = self.path(key, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, name, data):
+        # Write to temporary file first so readers never see a partial file
+        path = self.path(key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+        if self.size is not None:
+            self.size += len(data)
+
+    def evict(self):
+        # Remove least recently used files until cache fits, return its size
+        if self.size is not None and self.size <= self.max_bytes:
+            return self.size
+
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        self.size = total
+        return total
+
+
+@lru_cache(maxsize=None)
+def _image_cache(directory, max_bytes):
+    return ImageCache(directory, max_bytes)
+
+
+def get_image_cache():
+    # One cache per directory and process, so its tracked size is kept
+    return _image_cache(
+        settings.IMAGE_CACHE_DIR,
+        getattr(settings, "IMAGE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)
+    )
+
+
+def _check_url(url):
+    # Only fetch http(s) from public hosts, unless settings.IMAGE_FETCH_ALLOW_PRIVATE
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ImageError(f"Unsupported image URL: {url}")
+
+    if getattr(settings, "IMAGE_FETCH_ALLOW_PRIVATE", False):
+        return
+
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or parts.scheme, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ImageError(f"Cannot resolve {parts.hostname}: {e}")
+
+    for *_, address in addresses:
+        if not ipaddress.ip_address(address[0]).is_global:
+            raise ImageError(f"Image host {parts.hostname} is not public.")
+
+
+class CheckedRedirectHandler(HTTPRedirectHandler):
+    # Follow redirects only to URLs passing the same check as the original
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch_image(url):
+    """
+    Download image, refusing anything larger than settings.IMAGE_MAX_BYTES.
+    The URL and every redirect target are checked before they are requested.
+    The host is resolved again when connecting, so a host changing its DNS
+    answer in between (DNS rebinding) is not caught.
+    """
+    _check_url(url)
+    max_bytes = getattr(settings, "IMAGE_MAX_BYTES", DEFAULT_MAX_BYTES)
+    timeout = getattr(settings, "IMAGE_FETCH_TIMEOUT", DEFAULT_FETCH_TIMEOUT)
+    opener = build_opener(CheckedRedirectHandler)
+
+    try:
+        with opener.open(Request(url, headers={"User-Agent": "commerce-images"}), timeout=timeout) as response:
+            data = response.read(max_bytes + 1)
+    except (URLError, OSError, ValueError) as e:
+        raise ImageError(f"Cannot fetch {url}: {e}")
+
+    if len(data) > max_bytes:
+        raise ImageError(f"Image at {url} is larger than {max_bytes} bytes.")
+
+    return data
+
+
+def make_thumbnails(data):
+    # JPEG thumbnail of every size in THUMBNAIL_SIZES
+    try:
+        with Image.open(BytesIO(data)) as image:
+            # Let JPEG decoder downscale while decoding, much faster for large photos
+            image.draft("RGB", max(THUMBNAIL_SIZES.values()))
+            image = image.convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageError(f"Cannot decode image: {e}")
+
+    thumbnails = {}
+    for name, size in THUMBNAIL_SIZES.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail(size)
+        output = BytesIO()
+        thumbnail.save(output, "JPEG", quality=85, optimize=True)
+        thumbnails[name] = output.getvalue()
+
+    return thumbnails
+
+
+def store_image(data):
+    # Cache thumbnails of image data unless already cached, return its key
+    key = hashlib.sha256(data).hexdigest()
+    cache = get_image_cache()
+
+    missing = [name for name in THUMBNAIL_SIZES if cache.get(key, name) is None]
+    if missing:
+        thumbnails = make_thumbnails(data)
+        for name in missing:
+            cache.put(key, name, thumbnails[name])
+        cache.evict()
+
+    return key
+
+
+def cache_listing_image(listing):
+    """
+    Fetch the image of listing once, cache its thumbnails and store their key
+    on the listing. Listings without a usable image get an empty key and show
+    the local placeholder.
+    """
+    key = ""
+    if listing.image_url:
+        try:
+            key = store_image(fetch_image(listing.image_url))
+        except ImageError as e:
+            logger.warning("Image of listing %s not cached: %s", listing.pk, e)
+
+    # Save key without touching update date, cached page fragments embed it
+    if key != listing.image_key:
+        Listing.objects.filter(pk=listing.pk).update(image_key=key)
+        listing.image_key = key
+        bump_listing_version(listing.pk)
+
+    return key
+
+
+def cache_pending_images(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Fetch the images queued by creating, editing or importing listings and by
+    thumbnail misses, in pk order, and return the number of listings handled.
+    A listing stays queued if its image URL was edited meanwhile.
+    """
+    handled = 0
+    after = 0
+    while True:
+        listings = list(
+            Listing.objects.filter(image_pending=True, pk__gt=after).order_by("pk")
+            .only("pk", "image_url", "image_key")[:batch_size]
+        )
+        if not listings:
+            return handled
+
+        for listing in listings:
+            cache_listing_image(listing)
+            Listing.objects.filter(pk=listing.pk, image_url=listing.image_url).update(image_pending=False)
+        handled += len(listings)
+        after = listings[-1].pk
+
+
+def get_thumbnail(key, name):
+    # Path of thumbnail or None. Evicted thumbnails are queued for the worker
+    # to fetch again from a listing's image url, requests never fetch images.
+    path = get_image_cache().get(key, name)
+    if path is None:
+        listing = Listing.objects.filter(image_key=key).exclude(image_url="").values("pk")[:1]
+        Listing.objects.filter(pk__in=listing, image_pending=False).update(image_pending=True)
+
+    return path
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from auctions.archive import DEFAULT_ARCHIVE_AFTER_DAYS, DEFAULT_BATCH_SIZE, archive_bids
+
+
+class Command(BaseCommand):
+    help = "Move losing bids of listings closed longer than --days into the bid archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=DEFAULT_ARCHIVE_AFTER_DAYS,
+            help="Archive bids of listings closed more than this many days ago."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of listings archived per transaction."
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_bids(days=options["days"], batch_size=options["batch_size"])
+        self.stdout.write(f"Archived bids of {archived} listing(s).")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.bidding import backfill_bid_aggregates, inconsistent_bid_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute listings' bid_count and highest_bidder from their bids."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report listings with inconsistent aggregates, exit with error if any."
+        )
+
+    def handle(self, *args, **options):
+        # Report inconsistent listings
+        if options["check"]:
+            inconsistent = list(inconsistent_bid_aggregates().values_list(
+                "pk", "bid_count", "actual_bid_count", "stored_highest_bidder", "actual_highest_bidder"
+            ))
+            for pk, bid_count, actual_bid_count, highest_bidder, actual_highest_bidder in inconsistent:
+                self.stdout.write(
+                    f"Listing ID: {pk}, bid_count: {bid_count} (expected {actual_bid_count}), "
+                    f"highest_bidder: {highest_bidder or None} (expected {actual_highest_bidder or None})"
+                )
+
+            if inconsistent:
+                raise CommandError(f"{len(inconsistent)} listing(s) with inconsistent bid aggregates.")
+
+            self.stdout.write(self.style.SUCCESS("All bid aggregates are consistent."))
+            return
+
+        # Recompute aggregates of all listings
+        updated = backfill_bid_aggregates()
+        self.stdout.write(self.style.SUCCESS(f"Updated bid aggregates of {updated} listing(s)."))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.images import DEFAULT_BATCH_SIZE, cache_pending_images
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Fetch images of listings queued by creating, editing or importing them, or by evicted thumbnails."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Queue and fetch images of all listings again, not only queued ones."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of queued listings read per query."
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and fetch queued images every --interval seconds."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between runs with --loop."
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            Listing.objects.exclude(image_url="").update(image_pending=True)
+
+        while True:
+            cached = cache_pending_images(batch_size=options["batch_size"])
+            if cached or not options["loop"]:
+                self.stdout.write(f"Fetched images of {cached} listing(s).")
+
+            if not options["loop"]:
+                return
+
+            time.sleep(options["interval"])
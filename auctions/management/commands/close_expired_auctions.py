@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.expiry import DEFAULT_BATCH_SIZE, close_expired_auctions
+
+
+class Command(BaseCommand):
+    help = "Close listings whose end time has passed and assign their winners."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of listings closed per transaction."
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and close expired listings every --interval seconds."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="Seconds to wait between runs with --loop."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            closed = close_expired_auctions(batch_size=options["batch_size"])
+            if closed or not options["loop"]:
+                self.stdout.write(f"Closed {closed} expired listing(s).")
+
+            if not options["loop"]:
+                return
+
+            time.sleep(options["interval"])
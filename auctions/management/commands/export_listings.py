@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from auctions.catalog import DEFAULT_CHUNK_SIZE, FORMATS, export_listings, guess_format
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Write listings to a CSV or JSON Lines file without loading them all into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to write, - for standard output.")
+        parser.add_argument("--format", choices=FORMATS, help="File format, guessed from the file extension by default.")
+        parser.add_argument("--seller", help="Only export listings of this username.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of rows fetched from the database at a time."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+
+        listings = Listing.objects.all()
+        if options["seller"]:
+            listings = listings.filter(seller__username=options["seller"])
+
+        if path == "-":
+            count = export_listings(sys.stdout, format, listings, options["chunk_size"])
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                count = export_listings(file, format, listings, options["chunk_size"])
+
+        self.stderr.write(f"Exported {count} listing(s).")
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.catalog import DEFAULT_BATCH_SIZE, FORMATS, guess_format, import_listings
+from auctions.models import User
+
+
+class Command(BaseCommand):
+    help = "Create listings from a CSV or JSON Lines file, validated like the create listing form."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for standard input.")
+        parser.add_argument("--seller", required=True, help="Username of the seller of all imported listings.")
+        parser.add_argument("--format", choices=FORMATS, help="File format, guessed from the file extension by default.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of listings inserted per transaction."
+        )
+
+    def handle(self, *args, **options):
+        # Check if seller exists
+        try:
+            seller = User.objects.get(username=options["seller"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['seller']} does not exist.")
+
+        path = options["path"]
+        format = options["format"] or guess_format(path)
+
+        def report(line, message):
+            self.stderr.write(f"Line {line}: {message}")
+
+        if path == "-":
+            result = import_listings(sys.stdin, seller, format, options["batch_size"], report)
+        else:
+            with open(path, newline="", encoding="utf-8") as file:
+                result = import_listings(file, seller, format, options["batch_size"], report)
+
+        self.stdout.write(f"Imported {result.created} listing(s), {len(result.errors)} row(s) rejected.")
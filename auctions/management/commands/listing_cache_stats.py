@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from auctions.caching import fragment_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the listing page fragment cache."
+
+    def handle(self, *args, **options):
+        stats = fragment_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0
+        self.stdout.write(f"Hits: {stats['hits']}, Misses: {stats['misses']}, Hit ratio: {ratio:.1%}")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from auctions.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of all listings."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.notifications import DEFAULT_BATCH_SIZE, deliver_notifications
+
+
+class Command(BaseCommand):
+    help = "Email pending outbid and auction won notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of notifications claimed and delivered at once."
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and deliver notifications every --interval seconds."
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between runs with --loop."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = deliver_notifications(batch_size=options["batch_size"])
+            if delivered or not options["loop"]:
+                self.stdout.write(f"Delivered {delivered} notification(s).")
+
+            if not options["loop"]:
+                return
+
+            time.sleep(options["interval"])
@@ -0,0 +1,214 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.utils import CursorWrapper
+from django.template.backends.django import Template
+
+
+logger = logging.getLogger("auctions.metrics")
+
+# Upper bounds (ms) of histogram buckets, last bucket is unbounded
+BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+# Recorder of the request being sampled in the current thread/task, if any
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestRecorder:
+    def __init__(self):
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = []
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries.append((sql, repr(params)))
+
+    @property
+    def duplicates(self):
+        # Number of queries repeating an earlier identical query
+        return len(self.queries) - len(set(self.queries))
+
+    def duplicate_sql(self):
+        return [sql for (sql, _), count in Counter(self.queries).items() if count > 1]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+
+    def add(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f"<={bound}" for bound in BUCKETS] + [f">{BUCKETS[-1]}"]
+        return {"buckets": dict(zip(labels, self.counts)), "sum": round(self.total, 3)}
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.wall_ms = Histogram()
+        self.db_ms = Histogram()
+        self.template_ms = Histogram()
+        self.queries = Histogram()
+        self.duplicate_queries = 0
+
+    def add(self, wall_ms, recorder):
+        self.requests += 1
+        self.wall_ms.add(wall_ms)
+        self.db_ms.add(recorder.db_time * 1000)
+        self.template_ms.add(recorder.template_time * 1000)
+        self.queries.add(len(recorder.queries))
+        self.duplicate_queries += recorder.duplicates
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "wall_ms": self.wall_ms.as_dict(),
+            "db_ms": self.db_ms.as_dict(),
+            "template_ms": self.template_ms.as_dict(),
+            "queries": self.queries.as_dict(),
+            "duplicate_queries": self.duplicate_queries,
+        }
+
+
+# Aggregated metrics per view name of this process
+_lock = threading.Lock()
+_views = {}
+
+
+def record(view_name, wall_ms, recorder):
+    with _lock:
+        _views.setdefault(view_name, ViewMetrics()).add(wall_ms, recorder)
+
+
+def snapshot():
+    with _lock:
+        return {name: metrics.as_dict() for name, metrics in sorted(_views.items())}
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+_template_render = Template.render
+
+
+def _timed_template_render(self, *args, **kwargs):
+    # Add render time to the sampled request, if any
+    recorder = _current.get()
+    if recorder is None:
+        return _template_render(self, *args, **kwargs)
+
+    start = time.perf_counter()
+    try:
+        return _template_render(self, *args, **kwargs)
+    finally:
+        recorder.template_time += time.perf_counter() - start
+
+
+_execute_with_wrappers = CursorWrapper._execute_with_wrappers
+
+
+def _timed_execute_with_wrappers(self, sql, params, many, executor):
+    # Time query for the sampled request, if any. The recorder is found through
+    # the context, which sync_to_async copies into the threads running the
+    # async views' queries, so queries on any thread's connection are seen.
+    recorder = _current.get()
+    if recorder is not None:
+        executor = partial(recorder.record_query, executor)
+    return _execute_with_wrappers(self, sql, params, many, executor)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, DB time, query count, repeated queries and template
+    render time of a sample of requests, aggregated per view name. Enabled by
+    setting REQUEST_METRICS_SAMPLE_RATE above 0; unsampled requests only pay
+    for one random() call and a context lookup per query. Runs in the
+    handler's mode, sync under WSGI and async under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, "REQUEST_METRICS_SAMPLE_RATE", 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed()
+
+        Template.render = _timed_template_render
+        CursorWrapper._execute_with_wrappers = _timed_execute_with_wrappers
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = RequestRecorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            _current.reset(token)
+
+        self.record(request, response, recorder, wall_ms)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        recorder = RequestRecorder()
+        token = _current.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            _current.reset(token)
+
+        self.record(request, response, recorder, wall_ms)
+        return response
+
+    def record(self, request, response, recorder, wall_ms):
+        match = request.resolver_match
+        view_name = match.view_name if match else "unresolved"
+        record(view_name, wall_ms, recorder)
+
+        logger.info(
+            "view=%s status=%s wall_ms=%.2f db_ms=%.2f template_ms=%.2f queries=%d duplicates=%d",
+            view_name, response.status_code, wall_ms, recorder.db_time * 1000,
+            recorder.template_time * 1000, len(recorder.queries), recorder.duplicates
+        )
+        for sql in recorder.duplicate_sql():
+            logger.warning("view=%s repeated query: %s", view_name, sql)
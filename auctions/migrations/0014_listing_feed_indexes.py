@@ -0,0 +1,21 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0013_alter_listing_category_alter_listing_winner'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['closed', '-update_date', '-id'], name='listing_closed_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['closed', '-creation_date', '-id'], name='listing_closed_created_idx'),
+        ),
+    ]
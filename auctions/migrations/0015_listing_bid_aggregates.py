@@ -0,0 +1,40 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def backfill_bid_aggregates(apps, schema_editor):
+    Listing = apps.get_model("auctions", "Listing")
+    Bid = apps.get_model("auctions", "Bid")
+
+    # Set bid count and highest bidder of every listing from existing bids
+    bids = Bid.objects.filter(listing=OuterRef("pk"))
+    Listing.objects.update(
+        bid_count=Coalesce(Subquery(bids.values("listing").annotate(count=Count("pk")).values("count")), 0),
+        highest_bidder=Subquery(bids.order_by("-bid_amount", "-pk").values("bidder")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0014_listing_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='highest_bidder',
+            field=models.ForeignKey(blank=True, default=None, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='highest_bid_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_bid_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_listing_bid_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='end_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['closed', 'end_time'], name='listing_closed_end_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    # SQLite: FTS5 table keyed by listing id, filled with existing listings
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE auctions_listing_fts "
+            "USING fts5(title, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO auctions_listing_fts (rowid, title, description) "
+            "SELECT id, title, description FROM auctions_listing"
+        )
+
+    # PostgreSQL: GIN index over the weighted tsvector expression
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX listing_search_idx ON auctions_listing USING GIN (("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE auctions_listing_fts")
+
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP INDEX listing_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0016_listing_end_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
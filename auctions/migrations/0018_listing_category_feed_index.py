@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0017_listing_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['category', 'closed', '-creation_date', '-id'], name='listing_category_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:43
+
+import auctions.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+CATEGORY_NAMES = ["Other", "Fashion", "Home", "Toys", "Electronics", "Pets", "Garden"]
+
+
+def seed_categories(apps, schema_editor):
+    Category = apps.get_model("auctions", "Category")
+
+    # Create missing categories (databases created before this migration already have them)
+    existing = set(Category.objects.filter(name__in=CATEGORY_NAMES).values_list("name", flat=True))
+    Category.objects.bulk_create([Category(name=name) for name in CATEGORY_NAMES if name not in existing])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0018_listing_category_feed_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_categories, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='listing',
+            name='category',
+            field=models.ForeignKey(blank=True, default=auctions.models.get_default_category_id, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='category_listings', to='auctions.category'),
+        ),
+    ]
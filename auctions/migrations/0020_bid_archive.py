@@ -0,0 +1,32 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0019_seed_categories'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BidArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('bids', models.JSONField(default=list)),
+                ('archive_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['listing', '-bid_amount'], name='bid_listing_amount_idx'),
+        ),
+        migrations.AddField(
+            model_name='bidarchive',
+            name='listing',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='bid_archive', to='auctions.listing'),
+        ),
+    ]
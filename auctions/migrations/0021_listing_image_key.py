@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-17 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0020_bid_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='image_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+
+def copy_watchlists(apps, schema_editor):
+    # One row per (user, listing) of the old per-user watchlists
+    Watchlist = apps.get_model("auctions", "Watchlist")
+    WatchlistItem = apps.get_model("auctions", "WatchlistItem")
+
+    rows = Watchlist.listings.through.objects.values_list("watchlist__user", "listing").order_by("pk")
+    batch = []
+    for user_id, listing_id in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(WatchlistItem(user_id=user_id, listing_id=listing_id))
+        if len(batch) >= BATCH_SIZE:
+            WatchlistItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    WatchlistItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def restore_watchlists(apps, schema_editor):
+    Watchlist = apps.get_model("auctions", "Watchlist")
+    WatchlistItem = apps.get_model("auctions", "WatchlistItem")
+
+    watchlists = {}
+    for user_id, listing_id in WatchlistItem.objects.values_list("user", "listing").order_by("pk"):
+        if user_id not in watchlists:
+            watchlists[user_id] = Watchlist.objects.create(user_id=user_id)
+        watchlists[user_id].listings.add(listing_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0021_listing_image_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WatchlistItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added_date', models.DateTimeField(auto_now_add=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watchlist_items', to='auctions.listing')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watchlist_items', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='watchlistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'listing'), name='watchlist_item_unique'),
+        ),
+        migrations.RunPython(copy_watchlists, restore_watchlists),
+        migrations.DeleteModel(
+            name='Watchlist',
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0022_watchlist_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('OUTBID', 'Outbid'), ('WON', 'Auction won')], max_length=8)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('sent_date', models.DateTimeField(blank=True, null=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='auctions.listing')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('sent_date__isnull', True)), fields=['id'], name='notification_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0023_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProxyBid',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_amount', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('update_date', models.DateTimeField(auto_now=True)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', to='auctions.listing')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listing', '-max_amount', 'update_date'], name='proxy_bid_top_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='proxybid',
+            constraint=models.UniqueConstraint(fields=('listing', 'user'), name='proxy_bid_unique'),
+        ),
+    ]
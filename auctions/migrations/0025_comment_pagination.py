@@ -0,0 +1,34 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_counts(apps, schema_editor):
+    Listing = apps.get_model("auctions", "Listing")
+    Comment = apps.get_model("auctions", "Comment")
+
+    # Set comment count of every listing from existing comments
+    comments = Comment.objects.filter(listing=OuterRef("pk")).values("listing").annotate(count=Count("pk"))
+    Listing.objects.update(comment_count=Coalesce(Subquery(comments.values("count")), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0024_proxy_bid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['listing', '-date', '-id'], name='comment_listing_date_idx'),
+        ),
+        migrations.RunPython(backfill_comment_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0025_comment_pagination'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['seller', '-bid_count', '-id'], name='listing_seller_bids_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-17 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0026_seller_dashboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='claim_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.1 on 2026-10-17 17:43
+
+from django.db import migrations, models
+
+
+def queue_uncached_images(apps, schema_editor):
+    Listing = apps.get_model("auctions", "Listing")
+
+    # Images never cached so far are fetched by the worker
+    Listing.objects.exclude(image_url="").filter(image_key="").update(image_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0027_notification_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='image_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('image_pending', True)), fields=['id'], name='listing_image_pending_idx'),
+        ),
+        migrations.RunPython(queue_uncached_images, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
+from decimal import Decimal
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.urls import reverse
 
 
 NONE = "NONE"
@@ -20,6 +24,14 @@ CATEGORY_CHOICES = [
     (GARD, "Garden"),
 ]
 
+OUTBID = "OUTBID"
+WON = "WON"
+
+NOTIFICATION_KINDS = [
+    (OUTBID, "Outbid"),
+    (WON, "Auction won"),
+]
+
 
 class User(AbstractUser):
     pass
@@ -31,7 +43,8 @@ class User(AbstractUser):
         return self.username
     
     def get_watchlist_items(self):
-        return self.user_watchlist.first().listings.count()
+        # Count in a single query over the (user, listing) index
+        return WatchlistItem.objects.filter(user=self).count()
 
 
 class CategoryManager(models.Manager):
@@ -41,6 +54,12 @@ class CategoryManager(models.Manager):
     def get_default_category(self):
         return self.get(name=dict(CATEGORY_CHOICES)[NONE])
 
+    def with_active_counts(self):
+        # Number of active listings per category in a single GROUP BY query
+        return self.annotate(
+            active_count=models.Count("category_listings", filter=models.Q(category_listings__closed=False))
+        )
+
 
 class Category(models.Model):
     name = models.CharField(max_length=64)
@@ -51,10 +70,38 @@ class Category(models.Model):
         return self.name
     
 
-# Initialize all categories
-for _, name in CATEGORY_CHOICES:
-    if not Category.objects.filter(name=name).exists():
-        Category.objects.create_category(name)
+# Default category id, looked up once per process (categories are seeded by migration 0019)
+_default_category_id = None
+
+
+def get_default_category_id():
+    global _default_category_id
+    if _default_category_id is None:
+        _default_category_id = Category.objects.filter(
+            name=dict(CATEGORY_CHOICES)[NONE]
+        ).values_list("pk", flat=True).first()
+    return _default_category_id
+
+
+class ListingQuerySet(models.QuerySet):
+    def for_feed(self):
+        # Fetch related users and category in the same query as the listings
+        return self.select_related("winner", "seller", "category")
+
+    def seller_stats(self):
+        # Listing counts and bid totals in a single aggregate query
+        sold = models.Q(closed=True, winner__isnull=False)
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        return self.aggregate(
+            active_count=models.Count("pk", filter=models.Q(closed=False)),
+            closed_count=models.Count("pk", filter=models.Q(closed=True)),
+            sold_count=models.Count("pk", filter=sold),
+            total_bids=Coalesce(models.Sum("bid_count"), 0),
+            bid_volume=Coalesce(
+                models.Sum("current_bid", filter=models.Q(bid_count__gt=0)), Decimal("0.00"), output_field=money
+            ),
+            revenue=Coalesce(models.Sum("current_bid", filter=sold), Decimal("0.00"), output_field=money)
+        )
 
 
 class Listing(models.Model):
@@ -63,13 +110,45 @@ class Listing(models.Model):
     starting_bid = models.DecimalField(max_digits=9, decimal_places=2, default=0.00)
     current_bid = models.DecimalField(max_digits=9, decimal_places=2, default=0.00)
     image_url = models.URLField(max_length=255, blank=True)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="category_listings", blank=True, null=True, default=Category.objects.get_default_category)
+    image_key = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # Image waiting to be fetched by the cache_listing_images worker
+    image_pending = models.BooleanField(default=False, editable=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="category_listings", blank=True, null=True, default=get_default_category_id)
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name="seller_listings")
     winner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="winner_listings", default=None, blank=True, null=True)
+    bid_count = models.PositiveIntegerField(default=0, editable=False)
+    highest_bidder = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="highest_bid_listings", default=None, blank=True, null=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
     closed = models.BooleanField(default=False)
+    end_time = models.DateTimeField(blank=True, null=True)
     creation_date = models.DateTimeField(auto_now_add=True)
     update_date = models.DateTimeField(auto_now=True)
 
+    objects = ListingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of active/closed listings feeds
+            models.Index(fields=["closed", "-update_date", "-id"], name="listing_closed_update_idx"),
+            models.Index(fields=["closed", "-creation_date", "-id"], name="listing_closed_created_idx"),
+            models.Index(fields=["category", "closed", "-creation_date", "-id"], name="listing_category_feed_idx"),
+            # Scheduled closing of expired auctions
+            models.Index(fields=["closed", "end_time"], name="listing_closed_end_idx"),
+            # Seller dashboard's top listings by bid count
+            models.Index(fields=["seller", "-bid_count", "-id"], name="listing_seller_bids_idx"),
+            # Images waiting to be fetched, fetched ones drop out of the index
+            models.Index(fields=["id"], condition=models.Q(image_pending=True), name="listing_image_pending_idx"),
+        ]
+
+    @property
+    def thumbnail_url(self):
+        # Cached thumbnails of the listing's image, empty if not cached
+        return reverse("image", kwargs={"key": self.image_key, "name": "small"}) if self.image_key else ""
+
+    @property
+    def large_image_url(self):
+        return reverse("image", kwargs={"key": self.image_key, "name": "large"}) if self.image_key else ""
+
     def __str__(self):
         return f"Listing ID: {self.pk}, Title: {self.title}, Seller: {self.seller}, Closed: {self.closed}"
  
@@ -80,10 +159,47 @@ class Bid(models.Model):
     bid_amount = models.DecimalField(max_digits=9, decimal_places=2)
     bid_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Highest bid(s) of a listing
+            models.Index(fields=["listing", "-bid_amount"], name="bid_listing_amount_idx"),
+        ]
+
     def __str__(self):
         return f"Bidder: {self.bidder}, Listing: {self.listing}, Amount: {self.bid_amount}"
 
 
+class ProxyBid(models.Model):
+    # Maximum a user is willing to pay, bid on their behalf in increments
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="proxy_bids")
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="proxy_bids")
+    max_amount = models.DecimalField(max_digits=9, decimal_places=2)
+    update_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "user"], name="proxy_bid_unique"),
+        ]
+        indexes = [
+            # Top two proxies of a listing, earlier one wins ties
+            models.Index(fields=["listing", "-max_amount", "update_date"], name="proxy_bid_top_idx"),
+        ]
+
+    def __str__(self):
+        return f"Proxy bidder: {self.user}, Listing: {self.listing}, Maximum: {self.max_amount}"
+
+
+class BidArchive(models.Model):
+    # Losing bids of a long closed listing, moved out of the Bid table as one row
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, related_name="bid_archive")
+    bid_count = models.PositiveIntegerField(default=0)
+    bids = models.JSONField(default=list)
+    archive_date = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Archived bids: {self.bid_count}, Listing: {self.listing}"
+
+
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="user_comments")
     title = models.CharField(max_length=64)
@@ -91,13 +207,47 @@ class Comment(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="listing_comments")
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a listing's comments, newest first
+            models.Index(fields=["listing", "-date", "-id"], name="comment_listing_date_idx"),
+        ]
+
     def __str__(self):
         return f"User: {self.user}, Comment on: {self.listing}"
     
 
-class Watchlist(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="user_watchlist")
-    listings = models.ManyToManyField(Listing, related_name="listings_in_watchlist", blank=True)
+class WatchlistItem(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="watchlist_items")
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="watchlist_items")
+    added_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # One row per watched listing, its index serves membership checks
+            models.UniqueConstraint(fields=["user", "listing"], name="watchlist_item_unique"),
+        ]
+
+    def __str__(self):
+        return f"Watchlist User: {self.user}, Listing: {self.listing}"
+
+
+class Notification(models.Model):
+    # Outbox of emails to users, written in the transaction of the bid or close
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="notifications")
+    kind = models.CharField(max_length=8, choices=NOTIFICATION_KINDS)
+    amount = models.DecimalField(max_digits=9, decimal_places=2, blank=True, null=True)
+    creation_date = models.DateTimeField(auto_now_add=True)
+    # Set while a worker sends the notification outside a transaction
+    claim_date = models.DateTimeField(blank=True, null=True)
+    sent_date = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Pending notifications in order, sent ones drop out of the index
+            models.Index(fields=["id"], condition=models.Q(sent_date__isnull=True), name="notification_pending_idx"),
+        ]
 
     def __str__(self):
-        return f"Watchlist User: {self.user}"
+        return f"Notification: {self.kind}, User: {self.user}, Listing: {self.listing}"
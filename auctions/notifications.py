@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OUTBID, WON, Notification
+
+
+# Number of outbox rows claimed and delivered at once
+DEFAULT_BATCH_SIZE = 200
+
+# Seconds after which rows claimed by a worker that never marked them sent are
+# claimed again, overridable via settings.NOTIFICATION_CLAIM_TIMEOUT
+DEFAULT_CLAIM_TIMEOUT = 600
+
+
+def notify_outbid(user_id, listing_id, amount):
+    # Must run in the transaction saving the new highest bid
+    Notification.objects.create(user_id=user_id, listing_id=listing_id, kind=OUTBID, amount=amount)
+
+
+def notify_won(winners):
+    # Must run in the transaction closing the listings, winners are (listing id, user id, amount)
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, listing_id=listing_id, kind=WON, amount=amount)
+        for listing_id, user_id, amount in winners
+        if user_id
+    ])
+
+
+def _message(notifications):
+    # One email for all notifications of a kind on a listing for a user
+    latest = notifications[-1]
+    title = latest.listing.title
+
+    if latest.kind == WON:
+        subject = f"You won {title}"
+        body = f"Congratulations, you won the auction for \"{title}\" with your bid of ${latest.amount}."
+    else:
+        times = f" {len(notifications)} times" if len(notifications) > 1 else ""
+        subject = f"You have been outbid on {title}"
+        body = f"Your bid on \"{title}\" has been outbid{times}. The current bid is ${latest.amount}."
+
+    return EmailMessage(subject, body, to=[latest.user.email])
+
+
+def _claim(batch_size, now):
+    # Mark a batch of pending notifications as claimed in one short transaction.
+    # Claims older than the claim timeout belong to a crashed worker.
+    stale = now - timedelta(seconds=getattr(settings, "NOTIFICATION_CLAIM_TIMEOUT", DEFAULT_CLAIM_TIMEOUT))
+    with transaction.atomic():
+        pending = list(
+            Notification.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(Q(claim_date__isnull=True) | Q(claim_date__lt=stale), sent_date__isnull=True)
+            .select_related("user", "listing")
+            .order_by("pk")[:batch_size]
+        )
+        Notification.objects.filter(pk__in=[notification.pk for notification in pending]).update(claim_date=now)
+    return pending
+
+
+def deliver_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Send one batch of pending notifications and return the number of outbox
+    rows handled. Rows are claimed in one short transaction (skip_locked, so
+    several workers can run), emailed without holding any lock, then marked
+    sent in a second one. A failed delivery releases the claim, so the rows
+    stay pending for the next run.
+    Outbids of a user on the same listing are coalesced into one email, and
+    outbids are dropped if the user is the highest bidder again by now.
+    """
+    pending = _claim(batch_size, timezone.now())
+    if not pending:
+        return 0
+    ids = [notification.pk for notification in pending]
+
+    # Group by recipient, listing and kind, in order of creation
+    groups = {}
+    for notification in pending:
+        key = (notification.user_id, notification.listing_id, notification.kind)
+        groups.setdefault(key, []).append(notification)
+
+    messages = []
+    for (user_id, _, kind), notifications in groups.items():
+        listing = notifications[-1].listing
+        if kind == OUTBID and listing.highest_bidder_id == user_id:
+            continue
+        if notifications[-1].user.email:
+            messages.append(_message(notifications))
+
+    try:
+        get_connection().send_messages(messages)
+    except Exception:
+        Notification.objects.filter(pk__in=ids).update(claim_date=None)
+        raise
+
+    Notification.objects.filter(pk__in=ids).update(sent_date=timezone.now())
+    return len(pending)
+
+
+def deliver_notifications(batch_size=DEFAULT_BATCH_SIZE):
+    # Deliver batches until the outbox is empty, return total rows handled
+    total = 0
+    while True:
+        delivered = deliver_batch(batch_size)
+        if not delivered:
+            return total
+        total += delivered
@@ -0,0 +1,93 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+# Default number of listings per page, overridable via settings.LISTINGS_PAGE_SIZE
+DEFAULT_PAGE_SIZE = 25
+
+# Default number of comments per page, overridable via settings.COMMENTS_PAGE_SIZE
+DEFAULT_COMMENTS_PAGE_SIZE = 20
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def get_page_size():
+    return getattr(settings, "LISTINGS_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+
+
+def get_comments_page_size():
+    return getattr(settings, "COMMENTS_PAGE_SIZE", DEFAULT_COMMENTS_PAGE_SIZE)
+
+
+def encode_cursor(value, pk):
+    # Encode sort key and primary key of last row as opaque url-safe token
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    # Decode token back into (datetime, pk), rejecting anything malformed
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        value, pk = raw.rsplit("|", 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+
+    if value is None:
+        raise InvalidCursor(token)
+
+    return value, pk
+
+
+def _seek(queryset, field, cursor):
+    queryset = queryset.order_by(f"-{field}", "-pk")
+
+    # Continue strictly after the last row of the previous page
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk})
+        )
+
+    return queryset
+
+
+def _split(rows, field, page_size):
+    # Extra row fetched beyond page size means there is a next page
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            # Rows from .values(), which must include field and id
+            next_cursor = encode_cursor(last[field], last["id"])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.pk)
+
+    return rows, next_cursor
+
+
+def keyset_page(queryset, field, cursor=None, page_size=None):
+    """
+    Return one page of queryset ordered by (-field, -pk) and the token for the
+    next page (None on the last page). Seeks past the cursor instead of using
+    OFFSET, so every page costs the same regardless of its position.
+    """
+    page_size = page_size or get_page_size()
+    rows = list(_seek(queryset, field, cursor)[:page_size + 1])
+    return _split(rows, field, page_size)
+
+
+async def akeyset_page(queryset, field, cursor=None, page_size=None):
+    # Async version of keyset_page
+    page_size = page_size or get_page_size()
+    rows = [row async for row in _seek(queryset, field, cursor)[:page_size + 1]]
+    return _split(rows, field, page_size)
@@ -0,0 +1,140 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Listing
+
+
+# Maximum number of search results
+DEFAULT_RESULTS_LIMIT = 50
+
+FTS_TABLE = "auctions_listing_fts"
+
+# Same expression as the GIN index created in migration 0017, so queries use it
+PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def _terms(query):
+    return re.findall(r"\w+", query)
+
+
+class BasicSearchBackend:
+    """
+    Keeps a full-text index of listing titles and descriptions. search()
+    returns listing ids, best match first. This base needs no index and
+    searches with unindexed icontains, the fallback for other databases.
+    """
+
+    def index(self, listing):
+        pass
+
+    def remove(self, listing_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit):
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        listings = Listing.objects.all()
+        for term in terms:
+            listings = listings.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return list(listings.order_by("-update_date").values_list("pk", flat=True)[:limit])
+
+
+class SQLiteSearchBackend(BasicSearchBackend):
+    """
+    SQLite FTS5 table keyed by listing id, ranked with bm25 (title weighted
+    above description).
+    """
+
+    def index(self, listing):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)",
+                [listing.pk, listing.title, listing.description]
+            )
+
+    def remove(self, listing_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+                f"SELECT id, title, description FROM {Listing._meta.db_table}"
+            )
+
+    def search(self, query, limit):
+        # Quote every term to avoid FTS syntax errors, match term prefixes
+        terms = _terms(query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s",
+                [match, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """
+    PostgreSQL tsvector search over an expression GIN index, so no separate
+    index table has to be kept in sync.
+    """
+
+    def search(self, query, limit):
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {Listing._meta.db_table} "
+                f"WHERE ({PG_VECTOR}) @@ plainto_tsquery('english', %s) "
+                f"ORDER BY ts_rank(({PG_VECTOR}), plainto_tsquery('english', %s)) DESC LIMIT %s",
+                [" ".join(terms), " ".join(terms), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    # Backend from settings.SEARCH_BACKEND, else chosen by database vendor
+    if getattr(settings, "SEARCH_BACKEND", None):
+        return import_string(settings.SEARCH_BACKEND)()
+    return BACKENDS.get(connection.vendor, BasicSearchBackend)()
+
+
+def remove_deleted_listing(sender, instance, **kwargs):
+    # post_delete receiver, so deleted listings no longer take up search results
+    get_search_backend().remove(instance.pk)
+
+
+def search_listings(query, limit=None):
+    # Return matching listings in rank order
+    limit = limit or getattr(settings, "SEARCH_RESULTS_LIMIT", DEFAULT_RESULTS_LIMIT)
+    ids = get_search_backend().search(query, limit)
+    listings = Listing.objects.for_feed().in_bulk(ids)
+    return [listings[id] for id in ids if id in listings]
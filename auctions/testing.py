@@ -0,0 +1,34 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# In-memory caches replacing the configured ones, so tests and benchmarks
+# never read or clear the caches of a server running on the host
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-default",
+        "TIMEOUT": None,
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-sessions",
+    },
+}
+
+
+def isolated_caches(**caches):
+    # Override settings.CACHES with TEST_CACHES, aliases given replace their entry
+    return override_settings(CACHES={**TEST_CACHES, **caches})
+
+
+class TestRunner(DiscoverRunner):
+    # settings.TEST_RUNNER, runs the test suite with isolated caches
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches = isolated_caches()
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        super().teardown_test_environment(**kwargs)
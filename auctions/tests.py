@@ -1,3 +1,1295 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.middleware import get_user
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.contrib.sessions.backends.cache import SessionStore
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from PIL import Image
+
+from benchmarks.data import generate
+from benchmarks.views import over_budget, run
+
+from .archive import archivable_listings, archive_bids
+from .backends.sqlite3.base import DatabaseWrapper as SqliteDatabaseWrapper
+from .bidding import (
+    PLACED, NOT_FOUND, CLOSED, BELOW_STARTING, NOT_HIGHER,
+    backfill_bid_aggregates, bid_increment, inconsistent_bid_aggregates, place_bid, set_max_bid
+)
+from .catalog import export_listings, import_listings
+from .caching import fragment_cache_stats, get_category_counts, get_seller_stats, get_watchlist_count
+from . import async_views, images, metrics, views
+from .images import ImageCache, cache_listing_image, cache_pending_images
+from .events import BID, get_broker, listing_channel, publish_listing_event
+from .expiry import close_expired_auctions
+from .models import CATEGORY_CHOICES, NONE, User, Category, Listing, Bid, BidArchive, ProxyBid, Comment, WatchlistItem, Notification, OUTBID, WON, get_default_category_id
+from .notifications import deliver_notifications
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .search import get_search_backend, search_listings
+
+
+class ListingTestCase(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", "seller@example.com", "password")
+        self.category = Category.objects.create(name="Test")
+
+    def create_listing(self, **kwargs):
+        kwargs.setdefault("title", "Listing")
+        kwargs.setdefault("description", "Description")
+        kwargs.setdefault("seller", self.seller)
+        kwargs.setdefault("category", self.category)
+        return Listing.objects.create(**kwargs)
+
+
+class PaginationTests(ListingTestCase):
+    def test_cursor_roundtrip(self):
+        listing = self.create_listing()
+        value, pk = decode_cursor(encode_cursor(listing.update_date, listing.pk))
+        self.assertEqual(value, listing.update_date)
+        self.assertEqual(pk, listing.pk)
+
+    def test_invalid_cursor(self):
+        for token in ["", "not-a-token", "bm8tc2VwYXJhdG9y", "eHx5"]:
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+
+    def test_pages_cover_all_rows_once(self):
+        listings = [self.create_listing(title=f"Listing {i}") for i in range(7)]
+
+        # Give several listings the same timestamp to exercise the pk tiebreak
+        Listing.objects.filter(pk__in=[l.pk for l in listings[:4]]).update(update_date=listings[0].update_date)
+
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = keyset_page(Listing.objects.all(), "update_date", cursor, page_size=3)
+            seen.extend(row.pk for row in rows)
+            if cursor is None:
+                break
+
+        expected = list(Listing.objects.order_by("-update_date", "-pk").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    @override_settings(LISTINGS_PAGE_SIZE=2)
+    def test_index_next_page(self):
+        for i in range(3):
+            self.create_listing(title=f"Listing {i}")
+
+        response = self.client.get(reverse("index"))
+        self.assertEqual(len(response.context["listings"]), 2)
+        self.assertIsNotNone(response.context["next_cursor"])
+
+        response = self.client.get(reverse("index"), {"cursor": response.context["next_cursor"]})
+        self.assertEqual(len(response.context["listings"]), 1)
+        self.assertIsNone(response.context["next_cursor"])
+
+    def test_invalid_cursor_view(self):
+        response = self.client.get(reverse("closed"), {"cursor": "garbage"})
+        self.assertEqual(response.context["code"], 400)
+
+
+class FeedQueryTests(ListingTestCase):
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def create_closed_listings(self, count):
+        winner = User.objects.create_user(f"winner{count}", "winner@example.com", "password")
+        for i in range(count):
+            self.create_listing(title=f"Listing {i}", closed=True, winner=winner)
+
+    def test_closed_feed_constant_queries(self):
+        self.create_closed_listings(1)
+        few = self.count_queries(reverse("closed"))
+
+        self.create_closed_listings(10)
+        many = self.count_queries(reverse("closed"))
+
+        self.assertEqual(few, many)
+
+
+class CommentPaginationTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.listing = self.create_listing()
+        self.client.force_login(self.seller)
+        cache.clear()
+
+    def create_comments(self, count):
+        Comment.objects.bulk_create([
+            Comment(user=self.seller, listing=self.listing, title=f"Comment {i}", content="Content")
+            for i in range(count)
+        ])
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    @override_settings(COMMENTS_PAGE_SIZE=2)
+    def test_pages_of_comments(self):
+        self.create_comments(3)
+
+        response = self.client.get(reverse("listing", kwargs={"id": self.listing.pk}))
+        self.assertContains(response, "Comment 2")
+        self.assertContains(response, "Comment 1")
+        self.assertNotContains(response, "Comment 0")
+
+        # Next page is served as a bare fragment
+        cursor = response.content.decode().split("?cursor=")[1].split('"')[0]
+        response = self.client.get(reverse("listing_comments", kwargs={"id": self.listing.pk}), {"cursor": cursor})
+        self.assertEqual([comment.title for comment in response.context["comments"]], ["Comment 0"])
+        self.assertNotContains(response, "load-comments")
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("listing_comments", kwargs={"id": self.listing.pk}), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_comment_count_maintained(self):
+        for i in range(2):
+            self.client.post(reverse("comment", kwargs={"id": self.listing.pk}), {"title": "Hi", "content": "Hello"})
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.comment_count, 2)
+        response = self.client.get(reverse("listing", kwargs={"id": self.listing.pk}))
+        self.assertContains(response, "Comments (2)")
+
+    @override_settings(COMMENTS_PAGE_SIZE=5)
+    def test_listing_constant_queries(self):
+        self.create_comments(1)
+        few = self.count_queries(reverse("listing", kwargs={"id": self.listing.pk}))
+
+        self.create_comments(50)
+        many = self.count_queries(reverse("listing", kwargs={"id": self.listing.pk}))
+
+        self.assertEqual(few, many)
+
+
+class BiddingTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+
+    def test_first_bid_may_equal_starting_bid(self):
+        result = place_bid(self.listing.pk, self.bidder, Decimal("10.00"))
+        self.assertEqual(result.status, PLACED)
+        self.assertTrue(result.success)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_bid, Decimal("10.00"))
+
+    def test_bid_must_beat_current_bid(self):
+        place_bid(self.listing.pk, self.bidder, Decimal("15.00"))
+        self.assertEqual(place_bid(self.listing.pk, self.seller, Decimal("15.00")).status, NOT_HIGHER)
+        self.assertEqual(place_bid(self.listing.pk, self.seller, Decimal("12.00")).status, NOT_HIGHER)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_bid, Decimal("15.00"))
+        self.assertEqual(Bid.objects.filter(listing=self.listing).count(), 1)
+
+    def test_rejected_bids(self):
+        self.assertEqual(place_bid(self.listing.pk, self.bidder, Decimal("5.00")).status, BELOW_STARTING)
+        self.assertEqual(place_bid(0, self.bidder, Decimal("50.00")).status, NOT_FOUND)
+        Listing.objects.filter(pk=self.listing.pk).update(closed=True)
+        self.assertEqual(place_bid(self.listing.pk, self.bidder, Decimal("50.00")).status, CLOSED)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_bid_does_not_lower_current_bid(self):
+        # Another bidder already raised the price
+        Bid.objects.create(listing=self.listing, bidder=self.seller, bid_amount=Decimal("30.00"))
+        Listing.objects.filter(pk=self.listing.pk).update(current_bid=Decimal("30.00"), bid_count=1)
+        result = place_bid(self.listing.pk, self.bidder, Decimal("20.00"))
+        self.assertEqual(result.status, NOT_HIGHER)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_bid, Decimal("30.00"))
+
+    def test_bid_view(self):
+        self.client.force_login(self.bidder)
+        response = self.client.post(reverse("bid", kwargs={"id": self.listing.pk}), {"bid_amount": "11.00"})
+        self.assertRedirects(response, reverse("listing", kwargs={"id": self.listing.pk}), fetch_redirect_response=False)
+        self.assertTrue(Bid.objects.filter(listing=self.listing, bidder=self.bidder).exists())
+
+
+class ProxyBidTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user("alice", "alice@example.com", "password")
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.carol = User.objects.create_user("carol", "carol@example.com", "password")
+        self.listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+
+    def bids(self):
+        return list(
+            Bid.objects.filter(listing=self.listing).order_by("pk").values_list("bidder__username", "bid_amount")
+        )
+
+    def test_increments(self):
+        self.assertEqual(bid_increment(Decimal("0.50")), Decimal("0.05"))
+        self.assertEqual(bid_increment(Decimal("30.00")), Decimal("1.00"))
+        self.assertEqual(bid_increment(Decimal("9000.00")), Decimal("100.00"))
+
+    def test_competing_proxies(self):
+        self.assertTrue(set_max_bid(self.listing.pk, self.alice, Decimal("50.00")).success)
+        self.assertEqual(self.bids(), [("alice", Decimal("10.00"))])
+
+        result = set_max_bid(self.listing.pk, self.bob, Decimal("30.00"))
+        self.assertIn("another bidder", result.message)
+        self.assertEqual(self.bids()[1:], [("bob", Decimal("30.00")), ("alice", Decimal("31.00"))])
+
+        # Same maximum: earlier proxy wins at that amount
+        set_max_bid(self.listing.pk, self.carol, Decimal("50.00"))
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.highest_bidder, self.listing.current_bid), (self.alice, Decimal("50.00")))
+        self.assertFalse(inconsistent_bid_aggregates().exists())
+
+    def test_manual_bid_answered_by_proxy(self):
+        set_max_bid(self.listing.pk, self.alice, Decimal("50.00"))
+        result = place_bid(self.listing.pk, self.bob, Decimal("20.00"))
+        self.assertTrue(result.success)
+        self.assertIn("another bidder", result.message)
+        self.assertEqual(self.bids()[-1], ("alice", Decimal("20.50")))
+
+        # Bid above the maximum wins and the proxy stops
+        place_bid(self.listing.pk, self.bob, Decimal("60.00"))
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.highest_bidder, self.listing.current_bid), (self.bob, Decimal("60.00")))
+        self.assertEqual(set_max_bid(self.listing.pk, self.alice, Decimal("55.00")).status, NOT_HIGHER)
+
+    def test_resolution_uses_top_two_proxies(self):
+        bidders = [User.objects.create_user(f"proxy{i}", "", "password") for i in range(10)]
+        for i, bidder in enumerate(bidders):
+            ProxyBid.objects.create(listing=self.listing, user=bidder, max_amount=Decimal(20 + i))
+
+        place_bid(self.listing.pk, self.carol, Decimal("12.00"))
+        self.assertEqual(self.bids(), [
+            ("carol", Decimal("12.00")), ("proxy8", Decimal("28.00")), ("proxy9", Decimal("29.00"))
+        ])
+
+    def test_proxy_view(self):
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse("proxy_bid", kwargs={"id": self.listing.pk}), {"max_amount": "25.00"}, follow=True)
+        self.assertContains(response, "Maximum bid saved, your bid is $10.00.")
+        self.assertContains(self.client.post(reverse("proxy_bid", kwargs={"id": 0}), {"max_amount": "25.00"}), "Error: 404")
+
+
+class BidAggregateTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+
+    def test_place_bid_maintains_aggregates(self):
+        place_bid(self.listing.pk, self.bidder, Decimal("11.00"))
+        place_bid(self.listing.pk, self.seller, Decimal("12.00"))
+        place_bid(self.listing.pk, self.bidder, Decimal("12.00"))
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.bid_count, 2)
+        self.assertEqual(self.listing.highest_bidder, self.seller)
+        self.assertFalse(inconsistent_bid_aggregates().exists())
+
+    def test_backfill(self):
+        Bid.objects.create(listing=self.listing, bidder=self.bidder, bid_amount=Decimal("20.00"))
+        Bid.objects.create(listing=self.listing, bidder=self.seller, bid_amount=Decimal("15.00"))
+        self.assertEqual(list(inconsistent_bid_aggregates()), [self.listing])
+
+        with self.assertRaises(CommandError):
+            call_command("backfill_bid_aggregates", "--check", stdout=StringIO())
+
+        call_command("backfill_bid_aggregates", stdout=StringIO())
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.bid_count, 2)
+        self.assertEqual(self.listing.highest_bidder, self.bidder)
+        call_command("backfill_bid_aggregates", "--check", stdout=StringIO())
+
+    def test_close_assigns_highest_bidder(self):
+        place_bid(self.listing.pk, self.bidder, Decimal("11.00"))
+        self.client.force_login(self.seller)
+        self.client.post(reverse("close", kwargs={"id": self.listing.pk}))
+        self.listing.refresh_from_db()
+        self.assertTrue(self.listing.closed)
+        self.assertEqual(self.listing.winner, self.bidder)
+
+    def test_edit_keeps_concurrent_bid(self):
+        is_valid = views.NewListingForm.is_valid
+
+        def bid_then_validate(form):
+            # Bid committed after the edit view loaded the listing
+            place_bid(self.listing.pk, self.bidder, Decimal("11.00"))
+            return is_valid(form)
+
+        self.client.force_login(self.seller)
+        with mock.patch.object(views.NewListingForm, "is_valid", bid_then_validate):
+            self.client.post(reverse("edit", kwargs={"id": self.listing.pk}), {
+                "title": "Renamed",
+                "description": "Description",
+                "starting_bid": "10.00",
+                "category": self.category.pk
+            })
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.title, "Renamed")
+        self.assertEqual(self.listing.current_bid, Decimal("11.00"))
+        self.assertEqual(self.listing.bid_count, 1)
+        self.assertEqual(self.listing.highest_bidder, self.bidder)
+
+
+class SellerDashboardTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.client.force_login(self.seller)
+
+    def test_stats(self):
+        sold = self.create_listing(title="Sold", starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+        unsold = self.create_listing(title="Unsold", closed=True)
+        active = self.create_listing(title="Active", starting_bid=Decimal("5.00"), current_bid=Decimal("5.00"))
+        place_bid(sold.pk, self.bidder, Decimal("20.00"))
+        place_bid(sold.pk, self.seller, Decimal("25.00"))
+        place_bid(active.pk, self.bidder, Decimal("6.00"))
+        self.client.post(reverse("close", kwargs={"id": sold.pk}))
+
+        stats = self.client.get(reverse("dashboard")).context["stats"]
+        self.assertEqual(stats["active_count"], 1)
+        self.assertEqual(stats["closed_count"], 2)
+        self.assertEqual(stats["sold_count"], 1)
+        self.assertEqual(stats["total_bids"], 3)
+        self.assertEqual(stats["recent_bid_count"], 3)
+        self.assertEqual(stats["bid_volume"], Decimal("31.00"))
+        self.assertEqual(stats["revenue"], Decimal("25.00"))
+        self.assertEqual([listing["title"] for listing in stats["top_listings"]], ["Sold", "Active"])
+        self.assertNotIn(unsold.pk, [listing["id"] for listing in stats["top_listings"]])
+
+    def test_cached_until_bid_or_close(self):
+        listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+        self.assertEqual(get_seller_stats(self.seller.pk)["total_bids"], 0)
+        with self.assertNumQueries(0):
+            get_seller_stats(self.seller.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(listing.pk, self.bidder, Decimal("10.00"))
+        self.assertEqual(get_seller_stats(self.seller.pk)["total_bids"], 1)
+
+        self.client.post(reverse("close", kwargs={"id": listing.pk}))
+        self.assertEqual(get_seller_stats(self.seller.pk)["revenue"], Decimal("10.00"))
+
+        # Expired auctions closed by the scheduled command
+        self.create_listing(end_time=timezone.now() - timedelta(minutes=1))
+        cache.clear()
+        self.assertEqual(get_seller_stats(self.seller.pk)["active_count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            close_expired_auctions()
+        self.assertEqual(get_seller_stats(self.seller.pk)["active_count"], 0)
+
+    def test_constant_queries(self):
+        Listing.objects.bulk_create([
+            Listing(title=f"Listing {i}", description="Description", seller=self.seller, category=self.category, bid_count=i)
+            for i in range(50)
+        ])
+        with self.assertNumQueries(3):
+            stats = get_seller_stats(self.seller.pk)
+        self.assertEqual(len(stats["top_listings"]), 10)
+        self.assertEqual(stats["top_listings"][0]["bid_count"], 49)
+
+
+class BidArchiveTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+        for amount, bidder in [("11.00", self.bidder), ("12.00", self.seller), ("13.00", self.bidder)]:
+            place_bid(self.listing.pk, bidder, Decimal(amount))
+        Listing.objects.filter(pk=self.listing.pk).update(
+            closed=True, winner=self.bidder, update_date=timezone.now() - timedelta(days=31)
+        )
+
+    def test_archive_keeps_winning_bid(self):
+        recent = self.create_listing(closed=True)
+        Bid.objects.create(listing=recent, bidder=self.bidder, bid_amount=Decimal("1.00"))
+        Bid.objects.create(listing=recent, bidder=self.bidder, bid_amount=Decimal("2.00"))
+
+        self.assertEqual(archive_bids(days=30, batch_size=1), 1)
+        self.assertEqual(archive_bids(days=30), 0)
+
+        self.assertEqual(
+            list(Bid.objects.filter(listing=self.listing).values_list("bid_amount", "bidder")),
+            [(Decimal("13.00"), self.bidder.pk)]
+        )
+        archive = BidArchive.objects.get(listing=self.listing)
+        self.assertEqual(archive.bid_count, 2)
+        self.assertEqual([bid[1] for bid in archive.bids], ["12.00", "11.00"])
+        self.assertEqual(Bid.objects.filter(listing=recent).count(), 2)
+
+    def test_candidates_from_stored_counts(self):
+        before = timezone.now() - timedelta(days=30)
+        candidates = archivable_listings(before)
+        self.assertNotIn("auctions_bid\"", str(candidates.query))
+        self.assertEqual(list(candidates), [self.listing])
+
+        archive_bids(days=30)
+        self.assertEqual(list(archivable_listings(before)), [])
+
+    def test_aggregates_include_archived_bids(self):
+        call_command("archive_bids", "--days", "30", stdout=StringIO())
+        self.assertFalse(inconsistent_bid_aggregates().exists())
+
+        backfill_bid_aggregates()
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.bid_count, 3)
+        self.assertEqual(self.listing.highest_bidder, self.bidder)
+
+
+class ImageServer(BaseHTTPRequestHandler):
+    # Stub image host, serves images by path and counts requests
+    images = {}
+    redirects = {}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path in self.redirects:
+            self.send_response(302)
+            self.send_header("Location", self.redirects[self.path])
+            self.end_headers()
+            return
+        data = self.images.get(self.path)
+        self.send_response(200 if data else 404)
+        self.send_header("Content-Type", "image/png")
+        self.end_headers()
+        self.wfile.write(data or b"")
+
+    def log_message(self, *args):
+        pass
+
+
+def png(width, height):
+    output = BytesIO()
+    Image.new("RGB", (width, height), "red").save(output, "PNG")
+    return output.getvalue()
+
+
+class ImageTests(ListingTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ImageServer)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        ImageServer.images = {"/photo.png": png(1200, 600), "/small.png": png(10, 10)}
+        ImageServer.redirects = {"/moved.png": "/small.png"}
+        ImageServer.requests = []
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        settings = override_settings(IMAGE_CACHE_DIR=self.cache_dir.name, IMAGE_FETCH_ALLOW_PRIVATE=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_create_caches_thumbnails(self):
+        self.client.force_login(self.seller)
+        self.client.post(reverse("create"), {
+            "title": "Lamp", "description": "Lamp", "starting_bid": "1.00",
+            "image_url": f"{self.base_url}/photo.png", "category": self.category.pk
+        })
+        # Image is fetched by the worker, not by the request
+        self.assertEqual(ImageServer.requests, [])
+        call_command("cache_listing_images", stdout=StringIO())
+        listing = Listing.objects.get(title="Lamp")
+        self.assertEqual(len(listing.image_key), 64)
+        self.assertFalse(listing.image_pending)
+
+        response = self.client.get(listing.thumbnail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        with Image.open(BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (240, 120))
+
+        # Page shows thumbnail, not the original image
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, listing.thumbnail_url)
+        self.assertNotContains(response, listing.image_url)
+        self.assertEqual(ImageServer.requests, ["/photo.png"])
+
+    def test_evicted_thumbnail_is_fetched_again(self):
+        listing = self.create_listing(image_url=f"{self.base_url}/small.png")
+        key = cache_listing_image(listing)
+        ImageCache(self.cache_dir.name, 0).evict()
+
+        # Miss is answered with 404 and queued once, however often it is requested
+        url = reverse("image", kwargs={"key": key, "name": "large"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(len(ImageServer.requests), 1)
+        self.assertEqual(cache_pending_images(), 1)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(ImageServer.requests), 2)
+        self.assertEqual(self.client.get(reverse("image", kwargs={"key": "0" * 64, "name": "large"})).status_code, 404)
+
+    def test_edit_queues_changed_image(self):
+        listing = self.create_listing(image_url=f"{self.base_url}/small.png")
+        cache_listing_image(listing)
+        self.client.force_login(self.seller)
+        data = {
+            "title": "Renamed", "description": "Description", "starting_bid": "1.00",
+            "image_url": listing.image_url, "category": self.category.pk
+        }
+        self.client.post(reverse("edit", kwargs={"id": listing.pk}), data)
+        listing.refresh_from_db()
+        self.assertFalse(listing.image_pending)
+
+        self.client.post(reverse("edit", kwargs={"id": listing.pk}), {**data, "image_url": f"{self.base_url}/photo.png"})
+        listing.refresh_from_db()
+        self.assertTrue(listing.image_pending)
+        self.assertEqual(len(ImageServer.requests), 1)
+
+    def test_failed_fetch_uses_placeholder(self):
+        listing = self.create_listing(image_url=f"{self.base_url}/missing.png", image_key="0" * 64)
+        with self.assertLogs("auctions.images", "WARNING"):
+            self.assertEqual(cache_listing_image(listing), "")
+        listing.refresh_from_db()
+        self.assertEqual(listing.image_key, "")
+
+        with override_settings(IMAGE_FETCH_ALLOW_PRIVATE=False), self.assertLogs("auctions.images", "WARNING"):
+            listing.image_url = f"{self.base_url}/small.png"
+            self.assertEqual(cache_listing_image(listing), "")
+        self.assertEqual(len(ImageServer.requests), 1)
+
+    def test_redirect_target_is_checked(self):
+        listing = self.create_listing(image_url=f"{self.base_url}/moved.png")
+        self.assertEqual(len(cache_listing_image(listing)), 64)
+        self.assertEqual(ImageServer.requests, ["/moved.png", "/small.png"])
+
+        # Original URL allowed, redirect target refused
+        check_url = images._check_url
+
+        def refuse_small(url):
+            if url.endswith("/small.png"):
+                raise images.ImageError("Image host is not public.")
+            check_url(url)
+
+        ImageServer.requests = []
+        with mock.patch("auctions.images._check_url", refuse_small), self.assertLogs("auctions.images", "WARNING"):
+            self.assertEqual(cache_listing_image(listing), "")
+        self.assertEqual(ImageServer.requests, ["/moved.png"])
+
+    def test_lru_eviction(self):
+        cache = ImageCache(self.cache_dir.name, 250)
+        for i, key in enumerate(["a" * 64, "b" * 64, "c" * 64]):
+            cache.put(key, "small", b"x" * 100)
+            os.utime(cache.path(key, "small"), (i, i))
+        os.utime(cache.path("a" * 64, "small"), (10, 10))
+
+        self.assertEqual(cache.evict(), 200)
+        self.assertIsNone(cache.get("b" * 64, "small"))
+        self.assertIsNotNone(cache.get("a" * 64, "small"))
+
+        # Tracked size, the directory is not walked again while under the limit
+        with mock.patch("os.walk") as walk:
+            cache.put("d" * 64, "small", b"x" * 10)
+            self.assertEqual(cache.evict(), 210)
+        walk.assert_not_called()
+
+
+class NotificationTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user("alice", "alice@example.com", "password")
+        self.bob = User.objects.create_user("bob", "bob@example.com", "password")
+        self.listing = self.create_listing(title="Lamp", starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+
+    def test_outbids_are_queued_and_coalesced(self):
+        place_bid(self.listing.pk, self.alice, Decimal("11.00"))
+        place_bid(self.listing.pk, self.bob, Decimal("12.00"))
+        place_bid(self.listing.pk, self.bob, Decimal("13.00"))
+        place_bid(self.listing.pk, self.seller, Decimal("14.00"))
+
+        # Nothing is sent while bidding
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            list(Notification.objects.values_list("user__username", "kind", "amount")),
+            [("alice", OUTBID, Decimal("12.00")), ("bob", OUTBID, Decimal("14.00"))]
+        )
+
+        place_bid(self.listing.pk, self.alice, Decimal("15.00"))
+        self.assertEqual(deliver_notifications(), 3)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ["bob@example.com"])
+        self.assertIn("$14.00", mail.outbox[0].body)
+        self.assertEqual(mail.outbox[1].to, ["seller@example.com"])
+
+        # Delivered notifications are not sent again
+        self.assertEqual(deliver_notifications(), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_winner_notified_on_close(self):
+        place_bid(self.listing.pk, self.alice, Decimal("11.00"))
+        self.client.force_login(self.seller)
+        self.client.post(reverse("close", kwargs={"id": self.listing.pk}))
+        self.client.post(reverse("close", kwargs={"id": self.listing.pk}))
+
+        call_command("send_notifications", stdout=StringIO())
+        self.assertEqual([message.subject for message in mail.outbox], ["You won Lamp"])
+
+    def test_winner_notified_on_expiry(self):
+        place_bid(self.listing.pk, self.bob, Decimal("11.00"))
+        self.create_listing(end_time=timezone.now() - timedelta(minutes=1))
+        Listing.objects.filter(pk=self.listing.pk).update(end_time=timezone.now() - timedelta(minutes=1))
+        close_expired_auctions()
+
+        self.assertEqual(list(Notification.objects.values_list("user", "kind")), [(self.bob.pk, WON)])
+
+    def test_failed_delivery_stays_pending(self):
+        place_bid(self.listing.pk, self.alice, Decimal("11.00"))
+        place_bid(self.listing.pk, self.bob, Decimal("12.00"))
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError):
+            with self.assertRaises(OSError):
+                deliver_notifications()
+        self.assertTrue(Notification.objects.filter(sent_date__isnull=True).exists())
+        self.assertEqual(deliver_notifications(), 1)
+
+    def test_sent_outside_transaction(self):
+        place_bid(self.listing.pk, self.alice, Decimal("11.00"))
+        place_bid(self.listing.pk, self.bob, Decimal("12.00"))
+        atomic_blocks = len(connection.atomic_blocks)
+        send_messages = mail.get_connection().send_messages
+
+        def check_no_transaction(messages):
+            self.assertEqual(len(connection.atomic_blocks), atomic_blocks)
+            self.assertTrue(Notification.objects.filter(claim_date__isnull=False, sent_date__isnull=True).exists())
+            return send_messages(messages)
+
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=check_no_transaction):
+            self.assertEqual(deliver_notifications(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(NOTIFICATION_CLAIM_TIMEOUT=60)
+    def test_stale_claim_is_claimed_again(self):
+        place_bid(self.listing.pk, self.alice, Decimal("11.00"))
+        place_bid(self.listing.pk, self.bob, Decimal("12.00"))
+        Notification.objects.update(claim_date=timezone.now())
+        self.assertEqual(deliver_notifications(), 0)
+
+        Notification.objects.update(claim_date=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(deliver_notifications(), 1)
+
+
+class ListingCacheTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+        self.url = reverse("listing", kwargs={"id": self.listing.pk})
+
+    def test_hit_skips_comment_query(self):
+        Comment.objects.create(user=self.seller, title="Title", content="Content", listing=self.listing)
+        self.client.force_login(self.bidder)
+
+        with CaptureQueriesContext(connection) as miss:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as hit:
+            response = self.client.get(self.url)
+
+        self.assertLess(len(hit.captured_queries), len(miss.captured_queries))
+        self.assertContains(response, "Content")
+        self.assertEqual(fragment_cache_stats(), {"hits": 4, "misses": 4})
+
+    def test_bid_and_comment_invalidate(self):
+        self.client.force_login(self.bidder)
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("bid", kwargs={"id": self.listing.pk}), {"bid_amount": "42.00"})
+        self.assertContains(self.client.get(self.url), "$42.00")
+
+        self.client.post(reverse("comment", kwargs={"id": self.listing.pk}), {"title": "Hello", "content": "New comment"})
+        self.assertContains(self.client.get(self.url), "New comment")
+
+    def test_edit_invalidates(self):
+        self.client.get(self.url)
+        self.client.force_login(self.seller)
+        self.client.post(reverse("edit", kwargs={"id": self.listing.pk}), {
+            "title": "Renamed",
+            "description": "Description",
+            "starting_bid": "10.00",
+            "category": self.category.pk
+        })
+        self.assertContains(self.client.get(self.url), "Renamed")
+
+
+class WatchlistCountTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.listing = self.create_listing()
+        self.client.force_login(self.seller)
+
+    def test_no_watchlist(self):
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, '<span class="badge badge-secondary align-text-bottom">0</span>', html=True)
+
+    def test_add_and_remove_update_count(self):
+        self.assertEqual(get_watchlist_count(self.seller), 0)
+
+        self.client.post(reverse("add", kwargs={"id": self.listing.pk}))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_watchlist_count(self.seller), 1)
+
+        self.client.post(reverse("remove", kwargs={"id": self.listing.pk}), HTTP_REFERER=reverse("listing", kwargs={"id": self.listing.pk}))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_watchlist_count(self.seller), 0)
+
+    @override_settings(WATCHLIST_COUNT_TIMEOUT=60)
+    def test_count_expires_after_cascade_delete(self):
+        self.client.post(reverse("add", kwargs={"id": self.listing.pk}))
+        self.assertEqual(get_watchlist_count(self.seller), 1)
+
+        # Deleting the listing cascades to the watchlist without adjusting the count
+        self.listing.delete()
+        self.assertEqual(get_watchlist_count(self.seller), 1)
+        with mock.patch("time.time", return_value=time.time() + 61):
+            self.assertEqual(get_watchlist_count(self.seller), 0)
+
+    def test_add_and_remove_are_idempotent(self):
+        url = reverse("add", kwargs={"id": self.listing.pk})
+        self.client.post(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(url)
+        statements = [query for query in context.captured_queries if "watchlistitem" in query["sql"].lower()]
+        self.assertEqual(len(statements), 1)
+        self.assertContains(self.client.get(reverse("listing", kwargs={"id": self.listing.pk})), "already in your watchlist")
+        self.assertEqual(WatchlistItem.objects.filter(user=self.seller).count(), 1)
+        self.assertEqual(get_watchlist_count(self.seller), 1)
+
+        url = reverse("remove", kwargs={"id": self.listing.pk})
+        self.client.post(url)
+        response = self.client.post(url, follow=True)
+        self.assertContains(response, "Cannot remove listing not in your watchlist.")
+        self.assertEqual(get_watchlist_count(self.seller), 0)
+        self.assertContains(self.client.post(reverse("remove", kwargs={"id": 0})), "Error: 404")
+
+    def test_watchlist_page(self):
+        other = self.create_listing(title="Other")
+        self.client.post(reverse("add", kwargs={"id": self.listing.pk}))
+        self.client.post(reverse("add", kwargs={"id": other.pk}))
+        response = self.client.get(reverse("watchlist"))
+        self.assertEqual(response.context["listings"], [other, self.listing])
+        self.assertTrue(self.client.get(reverse("listing", kwargs={"id": other.pk})).context["watching"])
+
+
+class ExpiryTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.now = timezone.now()
+
+    def test_close_expired_assigns_winners(self):
+        past = self.now - timedelta(minutes=1)
+        with_bid = self.create_listing(end_time=past + timedelta(hours=1))
+        place_bid(with_bid.pk, self.bidder, Decimal("5.00"))
+        Listing.objects.filter(pk=with_bid.pk).update(end_time=past)
+        without_bid = self.create_listing(end_time=past)
+        running = self.create_listing(end_time=self.now + timedelta(hours=1))
+        unscheduled = self.create_listing()
+
+        self.assertEqual(close_expired_auctions(self.now, batch_size=1), 2)
+        self.assertEqual(close_expired_auctions(self.now), 0)
+
+        with_bid.refresh_from_db()
+        without_bid.refresh_from_db()
+        self.assertTrue(with_bid.closed)
+        self.assertEqual(with_bid.winner, self.bidder)
+        self.assertTrue(without_bid.closed)
+        self.assertIsNone(without_bid.winner)
+        self.assertFalse(Listing.objects.filter(pk__in=[running.pk, unscheduled.pk], closed=True).exists())
+
+    def test_no_bids_after_end_time(self):
+        listing = self.create_listing(end_time=self.now - timedelta(seconds=1))
+        self.assertEqual(place_bid(listing.pk, self.bidder, Decimal("5.00")).status, CLOSED)
+
+    def test_command(self):
+        self.create_listing(end_time=self.now - timedelta(seconds=1))
+        out = StringIO()
+        call_command("close_expired_auctions", stdout=out)
+        self.assertIn("Closed 1 expired listing(s).", out.getvalue())
+
+
+class SearchTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.seller)
+
+    def create(self, title, description):
+        self.client.post(reverse("create"), {
+            "title": title,
+            "description": description,
+            "starting_bid": "1.00",
+            "category": self.category.pk
+        })
+        return Listing.objects.get(title=title)
+
+    def test_ranked_search(self):
+        lamp = self.create("Desk lamp", "Bright light for reading")
+        book = self.create("Reading book", "A novel about a lamp")
+        self.create("Garden chair", "Wooden")
+
+        self.assertEqual(search_listings("lamp"), [lamp, book])
+        self.assertEqual(search_listings("read"), [book, lamp])
+        self.assertEqual(search_listings("\"*:"), [])
+
+    def test_edit_updates_index(self):
+        listing = self.create("Old title", "Description")
+        self.client.post(reverse("edit", kwargs={"id": listing.pk}), {
+            "title": "Bicycle",
+            "description": "Description",
+            "starting_bid": "1.00",
+            "category": self.category.pk
+        })
+        self.assertEqual(search_listings("old"), [])
+        self.assertEqual(search_listings("bicycle"), [listing])
+
+    def test_delete_removes_from_index(self):
+        listing = self.create("Desk lamp", "Bright")
+        listing.delete()
+        self.assertEqual(get_search_backend().search("lamp", 10), [])
+
+    def test_rebuild(self):
+        listing = self.create_listing(title="Unindexed telescope")
+        self.assertEqual(search_listings("telescope"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(search_listings("telescope"), [listing])
+
+    def test_search_view(self):
+        self.create("Desk lamp", "Bright")
+        response = self.client.get(reverse("search"), {"q": "lamp"})
+        self.assertContains(response, "Desk lamp")
+
+
+class ApiTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        self.listing = self.create_listing(starting_bid=Decimal("10.00"), current_bid=Decimal("10.00"))
+
+    def get(self, url, etag=None):
+        headers = {"if_none_match": etag} if etag else {}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, headers=headers)
+        return response, len(context.captured_queries)
+
+    def test_listing_not_modified_until_bid(self):
+        url = reverse("api_listing", kwargs={"id": self.listing.pk})
+        response, _ = self.get(url)
+        self.assertEqual(response.json()["listing"]["seller_name"], "seller")
+        self.assertIn("Last-Modified", response.headers)
+
+        response, queries = self.get(url, response.headers["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 1)
+
+        place_bid(self.listing.pk, self.bidder, Decimal("11.00"))
+        response, _ = self.get(url, response.headers["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["listing"]["highest_bidder_name"], "bidder")
+
+    def test_feed_changes_when_listing_leaves(self):
+        other = self.create_listing(title="Other")
+        url = reverse("api_listings")
+        response, _ = self.get(url)
+        self.assertEqual([row["id"] for row in response.json()["listings"]], [other.pk, self.listing.pk])
+        etag = response.headers["ETag"]
+
+        response, queries = self.get(url, etag)
+        self.assertEqual((response.status_code, queries), (304, 1))
+
+        Listing.objects.filter(pk=self.listing.pk).update(closed=True)
+        response, _ = self.get(url, etag)
+        self.assertEqual([row["id"] for row in response.json()["listings"]], [other.pk])
+
+    def test_feed_tagged_by_page(self):
+        self.create_listing(title="Other")
+        url = reverse("api_listings")
+        with self.settings(LISTINGS_PAGE_SIZE=1):
+            response, _ = self.get(url)
+            etag = response.headers["ETag"]
+
+            # Only the page's rows are read, not the whole feed
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, headers={"if_none_match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(len(context.captured_queries), 1)
+            self.assertIn("LIMIT 2", context.captured_queries[0]["sql"])
+
+            # A bid moves the listing onto the first page
+            place_bid(self.listing.pk, self.bidder, Decimal("11.00"))
+            response, _ = self.get(url, etag)
+        self.assertEqual([row["id"] for row in response.json()["listings"]], [self.listing.pk])
+
+    def test_feed_pages(self):
+        self.create_listing(title="Other")
+        with self.settings(LISTINGS_PAGE_SIZE=1):
+            first = self.client.get(reverse("api_listings")).json()
+            second = self.client.get(reverse("api_listings"), {"cursor": first["next_cursor"]}).json()
+        self.assertEqual([row["id"] for row in second["listings"]], [self.listing.pk])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(self.client.get(reverse("api_listings"), {"cursor": "bad"}).status_code, 400)
+
+    def test_categories_and_watchlist(self):
+        response, _ = self.get(reverse("api_categories"))
+        response, queries = self.get(reverse("api_categories"), response.headers["ETag"])
+        self.assertEqual((response.status_code, queries), (304, 0))
+
+        self.assertEqual(self.client.get(reverse("api_watchlist")).status_code, 401)
+        self.client.force_login(self.bidder)
+        WatchlistItem.objects.create(user=self.bidder, listing=self.listing)
+        response = self.client.get(reverse("api_watchlist"))
+        self.assertEqual([row["id"] for row in response.json()["listings"]], [self.listing.pk])
+
+
+class CatalogTests(ListingTestCase):
+    def test_import_csv_validates_rows(self):
+        file = StringIO(
+            "title,description,starting_bid,category\n"
+            "Lamp,Brass lamp,12.50,Test\n"
+            ",Missing title,5,Test\n"
+            "Chair,Oak chair,7,Unknown\n"
+            "Table,Pine table,20,\n"
+        )
+        result = import_listings(file, self.seller, "csv", batch_size=1)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [3, 4])
+        lamp = Listing.objects.get(title="Lamp")
+        self.assertEqual(lamp.category, self.category)
+        self.assertEqual(lamp.current_bid, Decimal("12.50"))
+        self.assertEqual(lamp.seller, self.seller)
+        self.assertEqual(search_listings("brass"), [lamp])
+
+    def test_import_jsonl(self):
+        file = StringIO(
+            '{"title": "Lamp", "description": "Brass lamp", "starting_bid": 0}\n'
+            "\n"
+            "not json\n"
+        )
+        result = import_listings(file, self.seller, "jsonl")
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(3, "Row is not a JSON object.")])
+
+    def test_export_import_roundtrip(self):
+        self.create_listing(title="Lamp", starting_bid=Decimal("3.00"), current_bid=Decimal("4.00"))
+        self.create_listing(title="Chair")
+
+        files = {}
+        for format in ["csv", "jsonl"]:
+            files[format] = StringIO()
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(export_listings(files[format], format, chunk_size=1), 2)
+            self.assertEqual(len(context.captured_queries), 1)
+
+        for format, file in files.items():
+            file.seek(0)
+            result = import_listings(file, self.seller, format)
+            self.assertEqual((result.created, result.errors), (2, []))
+
+        self.assertEqual(Listing.objects.filter(title="Lamp", category=self.category).count(), 3)
+
+    def test_import_command_unknown_seller(self):
+        with self.assertRaises(CommandError):
+            call_command("import_listings", "-", seller="nobody")
+
+
+class CategoryCountTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def counts(self):
+        return {category["pk"]: category["active_count"] for category in get_category_counts()}
+
+    def test_counts_active_listings(self):
+        other = Category.objects.create(name="Other test")
+        self.create_listing()
+        self.create_listing(closed=True)
+        self.create_listing(category=other)
+        self.create_listing(category=other)
+
+        with self.assertNumQueries(1):
+            counts = self.counts()
+        self.assertEqual(counts[self.category.pk], 1)
+        self.assertEqual(counts[other.pk], 2)
+
+        with self.assertNumQueries(0):
+            self.counts()
+
+    def test_close_invalidates(self):
+        listing = self.create_listing()
+        self.assertEqual(self.counts()[self.category.pk], 1)
+
+        self.client.force_login(self.seller)
+        self.client.post(reverse("close", kwargs={"id": listing.pk}))
+        self.assertEqual(self.counts()[self.category.pk], 0)
+
+    @override_settings(CATEGORY_COUNTS_TIMEOUT=60)
+    def test_counts_expire(self):
+        self.assertEqual(self.counts()[self.category.pk], 0)
+
+        # Listing created without invalidating, like a missed invalidation
+        self.create_listing()
+        self.assertEqual(self.counts()[self.category.pk], 0)
+        with mock.patch("time.time", return_value=time.time() + 61):
+            self.assertEqual(self.counts()[self.category.pk], 1)
+
+
+class DefaultCategoryTests(TestCase):
+    def test_categories_seeded(self):
+        names = set(Category.objects.values_list("name", flat=True))
+        self.assertTrue({name for _, name in CATEGORY_CHOICES} <= names)
+
+    def test_default_category_cached(self):
+        self.assertEqual(Category.objects.get(pk=get_default_category_id()).name, dict(CATEGORY_CHOICES)[NONE])
+        with self.assertNumQueries(0):
+            listing = Listing()
+        self.assertEqual(listing.category_id, get_default_category_id())
+
+
+class QueryBudgetTests(TestCase):
+    def test_views_within_query_budgets(self):
+        cache.clear()
+        generate(scale=1)
+        self.assertEqual(over_budget(run(iterations=3)), {})
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite profile")
+class SqliteProfileTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "profile.sqlite3")
+
+    def connect(self):
+        # New connection to a file database, like a new request's
+        wrapper = SqliteDatabaseWrapper({**connection.settings_dict, "NAME": self.path}, alias="profile")
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    @override_settings(SQLITE_PRAGMAS={"journal_mode": "WAL", "busy_timeout": 5000, "synchronous": "NORMAL"})
+    def test_pragmas_applied_on_connect(self):
+        cursor = self.connect()
+        for pragma, value in [("journal_mode", "wal"), ("busy_timeout", 5000), ("synchronous", 1)]:
+            cursor.execute(f"PRAGMA {pragma}")
+            self.assertEqual(cursor.fetchone()[0], value)
+
+    @override_settings(SQLITE_PRAGMAS={"journal_mode": "WAL", "busy_timeout": 0})
+    def test_transactions_take_write_lock(self):
+        first = self.connect()
+        second = self.connect()
+
+        # A transaction that has only begun already keeps other writers out
+        first.db._start_transaction_under_autocommit()
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            second.execute("BEGIN IMMEDIATE")
+        first.db.rollback()
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+class RequestMetricsTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_records_per_view(self):
+        listing = self.create_listing()
+        self.client.get(reverse("listing", kwargs={"id": listing.pk}))
+        self.client.get(reverse("index"))
+        self.client.get(reverse("index"))
+
+        User.objects.filter(pk=self.seller.pk).update(is_staff=True)
+        self.client.force_login(self.seller)
+        snapshot = self.client.get(reverse("metrics")).json()
+        self.assertEqual(snapshot["index"]["requests"], 2)
+        self.assertEqual(snapshot["listing"]["requests"], 1)
+        self.assertGreater(snapshot["listing"]["template_ms"]["sum"], 0)
+        self.assertEqual(sum(snapshot["index"]["queries"]["buckets"].values()), 2)
+
+    async def test_async_requests(self):
+        async def view(request):
+            await Listing.objects.acount()
+            await Listing.objects.acount()
+            return HttpResponse()
+
+        middleware = metrics.RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = AsyncRequestFactory().get("/")
+        request.resolver_match = None
+        self.assertEqual((await middleware(request)).status_code, 200)
+
+        snapshot = metrics.snapshot()["unresolved"]
+        self.assertEqual(snapshot["requests"], 1)
+        self.assertEqual(snapshot["queries"]["sum"], 2)
+        self.assertEqual(snapshot["duplicate_queries"], 1)
+
+    def test_duplicate_queries(self):
+        recorder = metrics.RequestRecorder()
+        execute = lambda sql, params, many, context: None
+        for params in [(1,), (1,), (2,)]:
+            recorder.record_query(execute, "SELECT %s", params, False, {})
+        self.assertEqual(recorder.duplicates, 1)
+        self.assertEqual(recorder.duplicate_sql(), ["SELECT %s"])
+
+    def test_endpoint_requires_staff(self):
+        self.assertEqual(self.client.get(reverse("metrics")).context["code"], 403)
+
+
+class SessionStorageTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.listing = self.create_listing()
+
+    def session_queries(self, client):
+        with CaptureQueriesContext(connection) as context:
+            client.get(reverse("listing", kwargs={"id": self.listing.pk}))
+            response = client.post(
+                reverse("comment", kwargs={"id": self.listing.pk}), {"title": "Hi", "content": "Hello"}, follow=True
+            )
+        self.assertContains(response, "New comment created.")
+        self.assertEqual(response.context["user"], self.seller)
+        return [query["sql"] for query in context.captured_queries if "django_session" in query["sql"]]
+
+    def test_browsing_skips_session_table(self):
+        for engine in ["django.contrib.sessions.backends.cache", "django.contrib.sessions.backends.signed_cookies"]:
+            with self.subTest(engine=engine), self.settings(SESSION_ENGINE=engine):
+                client = Client()
+                client.force_login(self.seller)
+                self.assertEqual(self.session_queries(client), [])
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+    def test_messages_do_not_write_db_session(self):
+        client = Client()
+        client.force_login(self.seller)
+        queries = self.session_queries(client)
+        self.assertTrue(queries)
+        self.assertFalse([sql for sql in queries if not sql.startswith("SELECT")])
+
+
+class ListingEventTests(ListingTestCase):
+    async def test_fan_out_from_other_thread(self):
+        async with get_broker().subscribe(listing_channel(1)) as first, \
+                get_broker().subscribe(listing_channel(1)) as second, \
+                get_broker().subscribe(listing_channel(2)) as other:
+            thread = threading.Thread(target=publish_listing_event, args=(1, BID), kwargs={"current_bid": 5})
+            thread.start()
+            thread.join()
+
+            for subscription in [first, second]:
+                self.assertEqual(await subscription.get(1), {"type": BID, "data": {"current_bid": 5}})
+            with self.assertRaises(asyncio.TimeoutError):
+                await other.get(0.01)
+
+    def test_bid_publishes_event(self):
+        bidder = User.objects.create_user("bidder", "bidder@example.com", "password")
+        listing = self.create_listing()
+
+        with mock.patch("auctions.bidding.publish_listing_event") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                place_bid(listing.pk, bidder, Decimal("3.00"))
+
+        publish.assert_called_once_with(listing.pk, BID, current_bid=Decimal("3.00"), bid_count=1, bidder="bidder")
+
+    async def test_stream(self):
+        listing = await Listing.objects.acreate(title="Listing", description="Description", seller=self.seller, category=self.category)
+        response = await views.listing_events(AsyncRequestFactory().get("/"), listing.pk)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b": connected\n\n")
+        publish_listing_event(listing.pk, BID, current_bid=Decimal("7.50"))
+        self.assertEqual(await anext(stream), b'event: bid\ndata: {"current_bid": "7.50"}\n\n')
+        await stream.aclose()
+
+    async def test_missing_listing(self):
+        response = await views.listing_events(AsyncRequestFactory().get("/"), 0)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_not_streamed_under_wsgi(self):
+        listing = await Listing.objects.acreate(title="Listing", description="Description", seller=self.seller, category=self.category)
+        response = await views.listing_events(RequestFactory().get("/"), listing.pk)
+        self.assertEqual(response.status_code, 204)
+
+    @skipIf(settings.ASYNC_VIEWS, "Event stream routed")
+    def test_page_without_events_under_wsgi(self):
+        listing = self.create_listing()
+        self.client.force_login(self.seller)
+        self.assertNotContains(self.client.get(reverse("listing", kwargs={"id": listing.pk})), "EventSource")
+
+
+class AsyncViewTests(ListingTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.listing = self.create_listing(title="Active listing")
+        self.closed_listing = self.create_listing(title="Closed listing", closed=True, winner=self.seller)
+        Comment.objects.create(user=self.seller, title="Title", content="Async comment", listing=self.listing)
+        WatchlistItem.objects.create(user=self.seller, listing=self.listing)
+
+    def request(self, user=None):
+        request = AsyncRequestFactory().get("/")
+        request.session = SessionStore()
+        request._cached_user = user or self.seller
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        return request
+
+    async def test_read_views(self):
+        pages = [
+            (async_views.index, [], "Active listing"),
+            (async_views.closed, [], "Closed listing"),
+            (async_views.categories, [], self.category.name),
+            (async_views.category, [self.category.pk], "Active listing"),
+            (async_views.listing, [self.listing.pk], "Async comment"),
+            (async_views.watchlist, [], "There is 1 listing in your watchlist."),
+        ]
+        for view, args, text in pages:
+            self.assertContains(await view(self.request(), *args), text)
+
+    async def test_watchlist_count_not_cached(self):
+        # Count is rendered even if it is evicted before the template reads it
+        with mock.patch.object(cache, "aset"):
+            response = await async_views.index(self.request())
+        self.assertContains(response, '<span class="badge badge-secondary align-text-bottom">1</span>', html=True)
+
+    async def test_errors(self):
+        self.assertContains(await async_views.listing(self.request(), 0), "Error: 404")
+        self.assertContains(await async_views.category(self.request(), 0), "Error: 404")
+
+        response = await async_views.watchlist(self.request(AnonymousUser()))
+        self.assertEqual(response.status_code, 302)
@@ -1,22 +1,40 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 
-from . import views
+from . import api, async_views, views
+
+# Read-only views are served by their async versions under ASGI
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path("", views.index, name="index"),
-    path("categories", views.categories, name="categories"),
-    path("categories/<int:category_id>", views.category, name="category"),
-    path("closed", views.closed, name="closed"),
+    path("", read_views.index, name="index"),
+    path("api/categories", api.categories, name="api_categories"),
+    path("api/listings", api.listings, name="api_listings"),
+    path("api/listings/<int:id>", api.listing, name="api_listing"),
+    path("api/watchlist", api.watchlist, name="api_watchlist"),
+    path("categories", read_views.categories, name="categories"),
+    path("categories/<int:category_id>", read_views.category, name="category"),
+    path("closed", read_views.closed, name="closed"),
     path("create", views.create, name="create"),
-    path("listings/<int:id>", views.listing, name="listing"),
+    path("dashboard", views.dashboard, name="dashboard"),
+    re_path(r"^images/(?P<key>[0-9a-f]{64})/(?P<name>\w+)$", views.image, name="image"),
+    path("listings/<int:id>", read_views.listing, name="listing"),
     path("listings/<int:id>/add", views.addWatchlist, name="add"),
     path("listings/<int:id>/bid", views.bid, name="bid"),
     path("listings/<int:id>/close", views.close, name="close"),
     path("listings/<int:id>/comment", views.comment, name="comment"),
+    path("listings/<int:id>/comments", views.listing_comments, name="listing_comments"),
     path("listings/<int:id>/edit", views.edit, name="edit"),
+    path("listings/<int:id>/proxy", views.proxy_bid, name="proxy_bid"),
     path("listings/<int:id>/remove", views.removeWatchlist, name="remove"),
     path("login", views.login_view, name="login"),
     path("logout", views.logout_view, name="logout"),
+    path("metrics", views.metrics, name="metrics"),
     path("register", views.register, name="register"),
-    path("watchlist", views.watchlist, name="watchlist"),
+    path("search", views.search, name="search"),
+    path("watchlist", read_views.watchlist, name="watchlist"),
 ]
+
+# Event streams never end, so they are only served under ASGI
+if settings.ASYNC_VIEWS:
+    urlpatterns.append(path("listings/<int:id>/events", views.listing_events, name="listing_events"))
@@ -1,13 +1,34 @@
+import asyncio
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import FileResponse, HttpResponse, HttpResponseNotFound, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from .bidding import NOT_FOUND, place_bid, set_max_bid
+from .caching import (
+    adjust_watchlist_count, bump_listing_version, get_category_counts, get_seller_stats, invalidate_category_counts,
+    invalidate_seller_stats, listing_fragments, SELLER_RECENT_DAYS
+)
+from .events import CLOSE, COMMENT, format_event, get_broker, listing_channel, publish_listing_event
+from .forms import NewListingForm, NewBidForm, NewCommentForm, NewProxyBidForm
+from .images import THUMBNAIL_SIZES, get_thumbnail
+from .metrics import snapshot as metrics_snapshot
+from .notifications import notify_won
+from .models import User, Category, Listing, Comment, WatchlistItem
+from .pagination import InvalidCursor, get_comments_page_size, keyset_page
+from .search import get_search_backend, search_listings
+
 
-from .forms import NewListingForm, NewBidForm, NewCommentForm
-from .models import User, Category, Listing, Bid, Comment, Watchlist
+# Seconds between keep-alive comments on idle event streams
+SSE_HEARTBEAT = 15
 
 
 @login_required(login_url="login")
@@ -24,21 +45,17 @@ def addWatchlist(request, id):
                 "message": "The listing does not exist."
             })
 
-        # Check if user's watchlist exists else create new one
+        # Add listing to watchlist, unique constraint rejects it if already there
         try:
-            watchlist = Watchlist.objects.get(user=request.user)
-        
-        except Watchlist.DoesNotExist:
-            watchlist = Watchlist.objects.create(user=request.user)
-        
-        # Check if listing already in watchlist
-        if Watchlist.objects.filter(user=request.user, listings=listing):
+            with transaction.atomic():
+                WatchlistItem.objects.create(user=request.user, listing=listing)
+
+        except IntegrityError:
             # Show error message and return to listing page
             messages.error(request, "This listing is already in your watchlist.")
             return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
-        
-        # Add listing to watchlist
-        watchlist.listings.add(listing)
+
+        adjust_watchlist_count(request.user.pk, 1)
 
         # Show success message and return listing page
         messages.success(request, "Listing added to your watchlist.")
@@ -55,52 +72,25 @@ def addWatchlist(request, id):
 def bid(request, id):    
     # Only POST method allowed
     if request.method == "POST":
-        # Check if listing exists
-        try:
-            listing = Listing.objects.get(pk=id)
-        
-        except Listing.DoesNotExist:
-            return render(request, "auctions/error.html", {
-                "code": 404,
-                "message": "The listing does not exist."
-            })
-        
-        # Check if listing is closed
-        if listing.closed is True:
-            messages.error(request, "Listing is closed, placing a bid is not possible.")
-            return HttpResponseRedirect(reverse("listing", kwargs={"id": id})) 
-    
         # Create form instance with POST data and check if valid
         form = NewBidForm(request.POST)
         if form.is_valid():
-            # Save form data to model, set bidder and listing
-            new_bid = form.save(commit=False)
-            new_bid.bidder = request.user
-            new_bid.listing = listing
-
-            # Check if bid at least starting bid and greater than highest bid (if any)
-            # Bid is lower than starting bid  
-            if new_bid.bid_amount < listing.starting_bid:
-                # Show error message and return listing page
-                messages.error(request, "Bid must be at least as large as starting bid.")
-                return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
-            
-            # Bid is at least as large as starting bid, other bids exist, but not higher than current bid
-            elif Bid.objects.filter(listing=listing) and new_bid.bid_amount <= listing.current_bid:
-                # Show error message and return listing page
-                messages.error(request, "Bid must be higher than current bid.")
-                return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
-            
-            # Bid is at least as large as starting bid, no other bids and/or higher than current bid
+            # Validate and place bid atomically
+            result = place_bid(id, request.user, form.cleaned_data["bid_amount"])
+
+            # Listing does not exist
+            if result.status == NOT_FOUND:
+                return render(request, "auctions/error.html", {
+                    "code": 404,
+                    "message": result.message
+                })
+
+            # Show success or error message and return listing page
+            if result.success:
+                messages.success(request, result.message)
             else:
-                # Save new bid, save amount as listing's current bid
-                new_bid.save()
-                listing.current_bid = new_bid.bid_amount
-                listing.save()
-                
-                # Show success message and return listing page
-                messages.success(request, "Successfully placed bid.")
-                return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
+                messages.error(request, result.message)
+            return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
         
         else:
             # If invalid show error message and return form with existing data
@@ -117,9 +107,9 @@ def bid(request, id):
 
 
 def categories(request):
-    # Return all categories in categories page
+    # Return all categories with their active listing counts in categories page
     return render(request, "auctions/categories.html", {
-        "categories": Category.objects.all()
+        "categories": get_category_counts()
     })
 
 
@@ -134,20 +124,25 @@ def category(request, category_id):
             "message": "Category does not exist."
         })
 
-    # Get all active listings in category ordered by creation date
+    # Get one page of active listings in category ordered by creation date
     try:
-        listings = Listing.objects.filter(category=category_id, closed=False).order_by("-creation_date")
+        listings, next_cursor = keyset_page(
+            Listing.objects.for_feed().filter(category=category_id, closed=False),
+            "creation_date",
+            request.GET.get("cursor")
+        )
     
-    except Listing.DoesNotExist:
+    except InvalidCursor:
         return render(request, "auctions/error.html", {
-            "code": 404,
-            "message": "Listings do not exist."
+            "code": 400,
+            "message": "Invalid page."
         })
     
-    # Return category page with all it's listings
+    # Return category page with it's listings
     return render(request, "auctions/category.html", {
         "category": category,
-        "listings": listings
+        "listings": listings,
+        "next_cursor": next_cursor
     })
 
 
@@ -155,33 +150,38 @@ def category(request, category_id):
 def close(request, id):
     # Only POST method allowed
     if request.method == "POST":
-        # Check if listing exists
-        try:
-            listing = Listing.objects.get(pk=id)
-        
-        except Listing.DoesNotExist:
-            return render(request, "auctions/error.html", {
-                "code": 404,
-                "message": "The listing does not exist."
-            })
-        
-        # Check if user is seller of listing
-        if listing.seller != request.user:
-            # Show error message and return listing page
-            messages.error(request, "Only listing's seller can close auction.")
-            return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
-        
-        # Close auction
-        listing.closed = True
+        # Lock listing so no bid changes the highest bidder while closing
+        with transaction.atomic():
+            # Check if listing exists
+            try:
+                listing = Listing.objects.select_for_update().get(pk=id)
+
+            except Listing.DoesNotExist:
+                return render(request, "auctions/error.html", {
+                    "code": 404,
+                    "message": "The listing does not exist."
+                })
+
+            # Check if user is seller of listing
+            if listing.seller_id != request.user.pk:
+                # Show error message and return listing page
+                messages.error(request, "Only listing's seller can close auction.")
+                return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
 
-        # Check if bids exist
-        if Bid.objects.filter(listing=listing):
-            # Get highest bidder and save as winner
-            highest_bidder = Bid.objects.filter(listing=listing).order_by("-bid_amount").first().bidder
-            listing.winner = highest_bidder
+            # Close auction, highest bidder (if any) wins
+            was_closed = listing.closed
+            listing.closed = True
+            listing.winner_id = listing.highest_bidder_id
 
-        # Save changes
-        listing.save()
+            # Save changes, winner is emailed later by the outbox worker
+            listing.save()
+            if not was_closed:
+                notify_won([(listing.pk, listing.winner_id, listing.current_bid)])
+
+        bump_listing_version(listing.pk)
+        invalidate_category_counts()
+        invalidate_seller_stats(listing.seller_id)
+        publish_listing_event(listing.pk, CLOSE)
 
         # Show success message and return listing page
         messages.success(request, "Auction closed.")
@@ -195,10 +195,23 @@ def close(request, id):
 
 
 def closed(request):
-    # Get all closed listings, last updated first
-    listings = Listing.objects.filter(closed=True).order_by("-update_date")
+    # Get one page of closed listings, last updated first
+    try:
+        listings, next_cursor = keyset_page(
+            Listing.objects.for_feed().filter(closed=True),
+            "update_date",
+            request.GET.get("cursor")
+        )
+    
+    except InvalidCursor:
+        return render(request, "auctions/error.html", {
+            "code": 400,
+            "message": "Invalid page."
+        })
+
     return render(request, "auctions/index.html", {
         "listings": listings,
+        "next_cursor": next_cursor,
         "closed": True
     })
 
@@ -224,7 +237,17 @@ def comment(request, id):
             new_comment = form.save(commit=False)
             new_comment.user = request.user
             new_comment.listing = listing
-            new_comment.save()
+
+            # Save comment and keep listing's comment count in step
+            with transaction.atomic():
+                new_comment.save()
+                Listing.objects.filter(pk=listing.pk).update(comment_count=F("comment_count") + 1)
+
+            bump_listing_version(listing.pk)
+            publish_listing_event(
+                listing.pk, COMMENT, title=new_comment.title, content=new_comment.content,
+                user=request.user.username, date=new_comment.date
+            )
 
             # Show success message and return listing page
             messages.success(request, "New comment created.")
@@ -251,7 +274,11 @@ def create(request):
             new_listing = form.save(commit=False)
             new_listing.seller = request.user
             new_listing.current_bid = new_listing.starting_bid
+            new_listing.image_pending = bool(new_listing.image_url)
             new_listing.save()
+            get_search_backend().index(new_listing)
+            invalidate_category_counts()
+            invalidate_seller_stats(request.user.pk)
 
             # Show success message and return page with new listing
             messages.success(request, "New listing created.")
@@ -271,6 +298,15 @@ def create(request):
     })
 
 
+@login_required(login_url="login")
+def dashboard(request):
+    # Return seller dashboard with stats of user's listings, cached until a bid or close
+    return render(request, "auctions/dashboard.html", {
+        "stats": get_seller_stats(request.user.pk),
+        "recent_days": SELLER_RECENT_DAYS
+    })
+
+
 @login_required(login_url="login")
 def edit(request, id):
     # Check if listing exists
@@ -288,8 +324,20 @@ def edit(request, id):
         # Create form instance with POST data and check if valid
         form = NewListingForm(request.POST, instance=listing)
         if form.is_valid():            
-            # Save form data
-            form.save()
+            # Save only the edited fields, so bids and comments committed since
+            # the listing was loaded keep their aggregates
+            listing = form.save(commit=False)
+            fields = [*form.Meta.fields, "update_date"]
+
+            # Queue image for the worker only if it changed
+            if "image_url" in form.changed_data or (listing.image_url and not listing.image_key):
+                listing.image_pending = True
+                fields.append("image_pending")
+            listing.save(update_fields=fields)
+            get_search_backend().index(listing)
+            bump_listing_version(listing.pk)
+            invalidate_category_counts()
+            invalidate_seller_stats(listing.seller_id)
 
             # Show success message and return listing page
             messages.success(request, "Listing was updated.")
@@ -310,18 +358,48 @@ def edit(request, id):
     })
 
 
+def image(request, key, name):
+    # Check if thumbnail exists
+    path = get_thumbnail(key, name) if name in THUMBNAIL_SIZES else None
+    try:
+        file = open(path, "rb") if path else None
+    except FileNotFoundError:
+        file = None
+
+    if file is None:
+        return HttpResponseNotFound()
+
+    # Thumbnails are named by content, so browsers may keep them forever
+    response = FileResponse(file, content_type="image/jpeg")
+    patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
+
 def index(request):
-    # Get all active listings, last updated first
-    listings = Listing.objects.filter(closed=False).order_by("-update_date")
+    # Get one page of active listings, last updated first
+    try:
+        listings, next_cursor = keyset_page(
+            Listing.objects.for_feed().filter(closed=False),
+            "update_date",
+            request.GET.get("cursor")
+        )
+    
+    except InvalidCursor:
+        return render(request, "auctions/error.html", {
+            "code": 400,
+            "message": "Invalid page."
+        })
+
     return render(request, "auctions/index.html", {
-        "listings": listings
+        "listings": listings,
+        "next_cursor": next_cursor
     })
 
 
 def listing(request, id):
     # Check if listing exists
     try:
-        listing = Listing.objects.get(pk=id)
+        listing = Listing.objects.select_related("seller", "category", "highest_bidder").get(pk=id)
     
     except Listing.DoesNotExist:
         return render(request, "auctions/error.html", {
@@ -339,32 +417,43 @@ def listing(request, id):
     winner = False
 
     # Check if listing in watchlist
-    if user.is_authenticated and Watchlist.objects.filter(user=user, listings=listing):
+    if user.is_authenticated and WatchlistItem.objects.filter(user=user, listing=listing).exists():
         watching = True
 
     # Check if bids exist
-    if user.is_authenticated and Bid.objects.filter(listing=listing):
+    if user.is_authenticated and listing.bid_count:
         # Get bid count
-        bid_count = Bid.objects.filter(listing=listing).count()
+        bid_count = listing.bid_count
 
         # Check if highest bid is user's
-        highest_bid = Bid.objects.filter(listing=listing).order_by("-bid_amount").first()
-        highest_bidder = highest_bid.bidder
-        if highest_bidder == request.user:
+        highest_bidder = listing.highest_bidder
+        if listing.highest_bidder_id == user.pk:
             current_bid = True
 
             # Check if auction is closed
             if listing.closed:
                 winner = True
 
-    # New bid form
+    # New bid and maximum bid forms
     bid_form = NewBidForm()
+    proxy_form = NewProxyBidForm()
 
     # New comment form
     comment_form = NewCommentForm()
 
-    # Get all comments for listing
-    comments = Comment.objects.filter(listing=listing).order_by("-date")
+    # Get shared parts of listing page from cache, first page of comments is only queried on a miss
+    def comments_context():
+        comments, next_cursor = keyset_page(
+            Comment.objects.filter(listing=listing).select_related("user"), "date", None, get_comments_page_size()
+        )
+        return {"comments": comments, "next_cursor": next_cursor, "listing_id": listing.pk}
+
+    fragments = listing_fragments(listing.pk, {
+        "body": ("auctions/listing_body.html", {"listing": listing}),
+        "bids": ("auctions/listing_bids.html", {"listing": listing}),
+        "details": ("auctions/listing_details.html", {"listing": listing}),
+        "comments": ("auctions/listing_comments.html", comments_context)
+    })
 
     # Return listing page
     return render(request, "auctions/listing.html", {
@@ -374,12 +463,65 @@ def listing(request, id):
         "highest_bidder": highest_bidder,
         "current_bid": current_bid,
         "bid_form": bid_form,
+        "proxy_form": proxy_form,
         "winner": winner,
         "comment_form": comment_form,
-        "comments": comments
+        "fragments": fragments
     })
 
 
+@login_required(login_url="login")
+def listing_comments(request, id):
+    # Get next page of listing's comments, loaded into listing page on scroll
+    try:
+        comments, next_cursor = keyset_page(
+            Comment.objects.filter(listing=id).select_related("user"),
+            "date",
+            request.GET.get("cursor"),
+            get_comments_page_size()
+        )
+
+    except InvalidCursor:
+        return render(request, "auctions/error.html", {
+            "code": 400,
+            "message": "Invalid page."
+        }, status=400)
+
+    # Return comments only, without page layout
+    return render(request, "auctions/listing_comments.html", {
+        "comments": comments,
+        "next_cursor": next_cursor,
+        "listing_id": id
+    })
+
+
+async def listing_events(request, id):
+    # Under WSGI the never ending stream would be buffered and hold a worker,
+    # 204 tells the page's EventSource not to reconnect
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    # Check if listing exists, without rendering the layout (which needs the user)
+    if not await Listing.objects.filter(pk=id).aexists():
+        return HttpResponseNotFound()
+
+    # Stream listing's bid, close and comment events to the page
+    async def stream():
+        async with get_broker().subscribe(listing_channel(id)) as subscription:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    yield format_event(await subscription.get(SSE_HEARTBEAT))
+                except asyncio.TimeoutError:
+                    # Keep idle connection open through proxies
+                    yield ": heartbeat\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 def login_view(request):
     if request.method == "POST":
 
@@ -411,6 +553,52 @@ def logout_view(request):
     return HttpResponseRedirect(reverse("index"))
 
 
+def metrics(request):
+    # Aggregated request metrics, only for staff or in debug mode
+    if not (settings.DEBUG or request.user.is_staff):
+        return render(request, "auctions/error.html", {
+            "code": 403,
+            "message": "Not allowed."
+        })
+
+    return JsonResponse(metrics_snapshot())
+
+
+@login_required(login_url="login")
+def proxy_bid(request, id):
+    # Only POST method allowed
+    if request.method == "POST":
+        # Create form instance with POST data and check if valid
+        form = NewProxyBidForm(request.POST)
+        if form.is_valid():
+            # Save maximum and let proxy bids compete atomically
+            result = set_max_bid(id, request.user, form.cleaned_data["max_amount"])
+
+            # Listing does not exist
+            if result.status == NOT_FOUND:
+                return render(request, "auctions/error.html", {
+                    "code": 404,
+                    "message": result.message
+                })
+
+            # Show success or error message and return listing page
+            if result.success:
+                messages.success(request, result.message)
+            else:
+                messages.error(request, result.message)
+            return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
+
+        # If invalid show error message and return listing page
+        messages.error(request, "Invalid maximum bid. Please resubmit.")
+        return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
+
+    # GET method not allowed
+    return render(request, "auctions/error.html", {
+        "code": 405,
+        "message": "GET method not allowed."
+    })
+
+
 def register(request):
     if request.method == "POST":
         username = request.POST["username"]
@@ -446,35 +634,28 @@ def register(request):
 def removeWatchlist(request, id):
     # Only POST method allowed
     if request.method == "POST":
-        # Check if listing exists
-        try:
-            listing = Listing.objects.get(pk=id)
-        
-        except Listing.DoesNotExist:
-            return render(request, "auctions/error.html", {
-                "code": 404,
-                "message": "The listing does not exist."
-            })
-        
-        # Check if listing in watchlist
-        if Watchlist.objects.filter(user=request.user, listings=listing):
-            # Get user's watchlist
-            watchlist = Watchlist.objects.get(user=request.user)
-
-            # Remove listing from watchlist
-            watchlist.listings.remove(listing)
+        # Remove listing from watchlist, nothing is deleted if it is not there
+        deleted, _ = WatchlistItem.objects.filter(user=request.user, listing=id).delete()
+        if deleted:
+            adjust_watchlist_count(request.user.pk, -1)
 
             # Show success message an return listing page or watchlist page depeding on origin
             messages.success(request, "Listing removed from your watchlist.")
-            if "/watchlist" in request.META["HTTP_REFERER"]:
+            if "/watchlist" in request.META.get("HTTP_REFERER", ""):
                 return HttpResponseRedirect(reverse("watchlist"))
             else:
                 return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
-        
-        else:
-            # Show error message and return listing page
-            messages.error(request, "Cannot remove listing not in your watchlist.")
-            return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
+
+        # Check if listing exists
+        if not Listing.objects.filter(pk=id).exists():
+            return render(request, "auctions/error.html", {
+                "code": 404,
+                "message": "The listing does not exist."
+            })
+
+        # Show error message and return listing page
+        messages.error(request, "Cannot remove listing not in your watchlist.")
+        return HttpResponseRedirect(reverse("listing", kwargs={"id": id}))
     
     # GET method not allowed
     return render(request, "auctions/error.html", {
@@ -483,21 +664,29 @@ def removeWatchlist(request, id):
     })
 
 
+def search(request):
+    # Return ranked listings matching query, if any
+    query = request.GET.get("q", "").strip()
+    listings = search_listings(query) if query else []
+
+    return render(request, "auctions/search.html", {
+        "query": query,
+        "listings": listings
+    })
+
+
 @login_required(login_url="login")
 def watchlist(request):
-    # Check if watchlist exists
-    try:
-        watchlist = Watchlist.objects.get(user=request.user)
-    except Watchlist.DoesNotExist:
-        # Return empty watchlist
-        return render(request, "auctions/watchlist.html")
-    
-    # Get listings in watchlist
-    listings = watchlist.listings.all()
+    # Get listings in watchlist, last added first
+    listings = list(
+        Listing.objects.for_feed()
+        .filter(watchlist_items__user=request.user)
+        .order_by("-watchlist_items__added_date")
+    )
 
     # Return watchlist page with listings
     return render(request, "auctions/watchlist.html", {
         "listings": listings,
-        "count": listings.count(),
+        "count": len(listings),
         "watchlist": True
     })
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Compare throughput of the read views: sync views under WSGI vs async views
+(auctions.async_views) under ASGI, for the same request workload.
+
+    python -m benchmarks.asgi [--scale N] [--requests N] [--concurrency N]
+
+Each mode runs in its own process (views are chosen when the URLconf is
+imported) against a throwaway database filled by benchmarks.data. WSGI
+requests are spread over a thread pool, ASGI requests over concurrent tasks on
+one event loop, mirroring how the respective servers run them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _workload(count, seed=0):
+    from django.urls import reverse
+
+    from auctions.models import Category, Listing
+
+    rng = random.Random(seed)
+    listings = list(Listing.objects.values_list("pk", flat=True))
+    categories = list(Category.objects.values_list("pk", flat=True))
+    pages = [
+        lambda: reverse("index"),
+        lambda: reverse("closed"),
+        lambda: reverse("categories"),
+        lambda: reverse("category", kwargs={"category_id": rng.choice(categories)}),
+        lambda: reverse("listing", kwargs={"id": rng.choice(listings)}),
+        lambda: reverse("watchlist"),
+    ]
+    return [pages[i % len(pages)]() for i in range(count)]
+
+
+def _run_wsgi(client, urls, concurrency):
+    def get(url):
+        return client.get(url).status_code
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(get, urls))
+
+
+def _run_asgi(client, urls, concurrency):
+    async def worker(queue, statuses):
+        while queue:
+            response = await client.get(queue.pop())
+            statuses.append(response.status_code)
+
+    async def main():
+        queue = list(urls)
+        statuses = []
+        await asyncio.gather(*[worker(queue, statuses) for _ in range(concurrency)])
+        return statuses
+
+    return asyncio.run(main())
+
+
+def measure(mode, scale, requests, concurrency):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+    os.environ["DJANGO_ASYNC_VIEWS"] = "1" if mode == "asgi" else "0"
+    django.setup()
+
+    from django.conf import settings
+    from django.test import AsyncClient, Client
+    from django.test.runner import DiscoverRunner
+
+    from auctions.models import User, Listing, WatchlistItem
+    from auctions.testing import isolated_caches
+    from benchmarks.data import generate
+
+    settings.ALLOWED_HOSTS = ["testserver"]
+    cache_settings = isolated_caches()
+    cache_settings.enable()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        generate(scale)
+        user = User.objects.create_user("benchmark", "benchmark@example.com", "password")
+        WatchlistItem.objects.bulk_create([WatchlistItem(user=user, listing_id=pk) for pk in Listing.objects.values_list("pk", flat=True)[:10]])
+        urls = _workload(requests)
+
+        # Log in once, all requests share the session cookie
+        client = AsyncClient() if mode == "asgi" else Client()
+        client.force_login(user)
+        run = _run_asgi if mode == "asgi" else _run_wsgi
+
+        # Warm caches before measuring
+        run(client, urls[:concurrency * 2], concurrency)
+
+        start = time.perf_counter()
+        statuses = run(client, urls, concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        runner.teardown_databases(old_config)
+        cache_settings.disable()
+
+    errors = sum(1 for status in statuses if status != 200)
+    return {
+        "mode": mode,
+        "requests": len(statuses),
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(statuses) / elapsed, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], help="Run a single mode in this process.")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.scale, args.requests, args.concurrency)))
+        sys.exit(0)
+
+    results = []
+    for mode in ["wsgi", "asgi"]:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.asgi", "--mode", mode, "--scale", str(args.scale),
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency)
+            ],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+
+    print(json.dumps(results, indent=4))
@@ -0,0 +1,118 @@
+"""
+Generate synthetic users, listings, bids, comments and watchlists.
+
+    python -m benchmarks.data [--scale N]
+
+Writes into the database configured in commerce.settings. Listings are spread
+over all CATEGORY_CHOICES and their bid aggregates (current_bid, bid_count,
+highest_bidder) match the generated bids.
+"""
+
+import argparse
+import os
+import random
+from decimal import Decimal
+
+
+# Rows created per unit of scale
+USERS = 50
+LISTINGS = 500
+BIDS_PER_LISTING = 5
+COMMENTS_PER_LISTING = 3
+WATCHLIST_SIZE = 10
+
+PASSWORD = "password"
+
+
+def generate(scale=1, seed=0, batch_size=1000):
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+
+    from auctions.models import CATEGORY_CHOICES, User, Category, Listing, Bid, Comment, WatchlistItem
+    from auctions.search import get_search_backend
+
+    rng = random.Random(seed)
+    categories = list(Category.objects.filter(name__in=[name for _, name in CATEGORY_CHOICES]).values_list("pk", flat=True))
+    offset = User.objects.count()
+
+    with transaction.atomic():
+        # Users share one password hash, hashing each would dominate runtime
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f"user{offset + i}", email=f"user{offset + i}@example.com", password=password)
+            for i in range(USERS * scale)
+        ], batch_size=batch_size)
+        user_ids = [user.pk for user in users]
+
+        # Listings with bid aggregates precomputed from the bids created below
+        listings = []
+        bidders = []
+        for i in range(LISTINGS * scale):
+            starting_bid = Decimal(rng.randint(1, 500))
+            seller = user_ids[i % len(user_ids)]
+            listing_bidders = [rng.choice(user_ids) for _ in range(rng.randint(0, BIDS_PER_LISTING * 2))]
+            bidders.append(listing_bidders)
+            listings.append(Listing(
+                title=f"Listing {i}",
+                description=f"Synthetic listing number {i} for benchmarking.",
+                starting_bid=starting_bid,
+                current_bid=starting_bid + max(len(listing_bidders) - 1, 0),
+                category_id=categories[i % len(categories)],
+                seller_id=seller,
+                bid_count=len(listing_bidders),
+                highest_bidder_id=listing_bidders[-1] if listing_bidders else None,
+                closed=rng.random() < 0.2
+            ))
+        listings = Listing.objects.bulk_create(listings, batch_size=batch_size)
+
+        # Winners of closed listings are their highest bidders
+        closed = [listing for listing in listings if listing.closed]
+        for listing in closed:
+            listing.winner_id = listing.highest_bidder_id
+        Listing.objects.bulk_update(closed, ["winner"], batch_size=batch_size)
+
+        # Increasing bids, the last one of every listing is the highest
+        Bid.objects.bulk_create([
+            Bid(listing_id=listing.pk, bidder_id=bidder, bid_amount=listing.starting_bid + j)
+            for listing, listing_bidders in zip(listings, bidders)
+            for j, bidder in enumerate(listing_bidders)
+        ], batch_size=batch_size)
+
+        Comment.objects.bulk_create([
+            Comment(
+                user_id=rng.choice(user_ids),
+                title=f"Comment {j}",
+                content=f"Synthetic comment {j} on listing {listing.pk}.",
+                listing_id=listing.pk
+            )
+            for listing in listings
+            for j in range(rng.randint(0, COMMENTS_PER_LISTING * 2))
+        ], batch_size=batch_size)
+
+        # Random listings in every user's watchlist
+        WatchlistItem.objects.bulk_create([
+            WatchlistItem(user_id=user_id, listing_id=listing.pk)
+            for user_id in user_ids
+            for listing in rng.sample(listings, min(WATCHLIST_SIZE, len(listings)))
+        ], batch_size=batch_size)
+
+        get_search_backend().rebuild()
+
+    return {
+        "users": len(users),
+        "listings": len(listings),
+        "bids": sum(len(listing_bidders) for listing_bidders in bidders),
+    }
+
+
+if __name__ == "__main__":
+    import django
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+    django.setup()
+    print(generate(args.scale, args.seed))
@@ -0,0 +1,156 @@
+"""
+Stress concurrent bidding under each database profile: SQLite as shipped by
+Django (rollback journal, one connection per request), SQLite tuned by
+commerce.settings (WAL, busy_timeout, synchronous=NORMAL, persistent
+connections) and, with --postgres, PostgreSQL configured by DJANGO_DB_* vars.
+
+    python -m benchmarks.database [--scale N] [--requests N] [--concurrency N] [--postgres]
+
+Each profile runs in its own process (settings are read from the environment
+at startup) against a throwaway database filled by benchmarks.data, SQLite in
+a temporary file so journal mode and locking behave as in production. Worker
+threads bid on a handful of listings while others read listing pages.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Environment of every profile
+PROFILES = {
+    "sqlite": {"DJANGO_DB_ENGINE": "sqlite", "DJANGO_SQLITE_TUNING": "0", "DJANGO_DB_CONN_MAX_AGE": "0"},
+    "sqlite-tuned": {"DJANGO_DB_ENGINE": "sqlite", "DJANGO_SQLITE_TUNING": "1", "DJANGO_DB_CONN_MAX_AGE": "60"},
+    "postgres": {"DJANGO_DB_ENGINE": "postgres", "DJANGO_DB_CONN_MAX_AGE": "60"},
+}
+
+# Listings all bids go to, so bidders contend for the same rows
+HOT_LISTINGS = 5
+
+
+def _workload(count, listings, seed=0):
+    from django.urls import reverse
+
+    # Every other request is a bid, amounts rise so most bids are accepted
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        listing = rng.choice(listings[:HOT_LISTINGS])
+        if i % 2 == 0:
+            requests.append(("post", reverse("bid", kwargs={"id": listing}), {"bid_amount": 1000 + i}))
+        else:
+            requests.append(("get", reverse("listing", kwargs={"id": listing}), {}))
+    return requests
+
+
+def measure(profile, scale, requests, concurrency):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+    os.environ.update(PROFILES[profile])
+    django.setup()
+
+    from django.conf import settings
+    from django.db import close_old_connections, connection
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from django.test.runner import DiscoverRunner
+
+    from auctions.models import User, Listing
+    from auctions.testing import isolated_caches
+    from benchmarks.data import generate
+
+    settings.ALLOWED_HOSTS = ["testserver"]
+    directory = tempfile.TemporaryDirectory()
+    if connection.vendor == "sqlite":
+        settings.DATABASES["default"]["TEST"]["NAME"] = os.path.join(directory.name, "benchmark.sqlite3")
+
+    # Count connections opened, persistent connections open one per thread
+    opened = []
+    connection_created.connect(lambda sender, connection, **kwargs: opened.append(1), weak=False)
+
+    cache_settings = isolated_caches()
+    cache_settings.enable()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        generate(scale)
+        listings = list(Listing.objects.filter(closed=False, end_time__isnull=True).values_list("pk", flat=True))
+        workload = _workload(requests, listings)
+
+        # One logged in client per worker thread, none of them sells the hot listings
+        clients = []
+        for i in range(concurrency):
+            client = Client()
+            client.force_login(User.objects.create_user(f"benchmark{i}", "benchmark@example.com", "password"))
+            clients.append(client)
+
+        def work(worker):
+            statuses = []
+            for method, url, data in workload[worker::concurrency]:
+                # Close or reuse connections as the request handler does,
+                # the test client disconnects this from its signals
+                close_old_connections()
+                try:
+                    statuses.append(getattr(clients[worker], method)(url, data).status_code)
+                except Exception:
+                    # "database is locked" and similar
+                    statuses.append(500)
+                close_old_connections()
+            connection.close()
+            return statuses
+
+        opened.clear()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            statuses = [status for result in executor.map(work, range(concurrency)) for status in result]
+        elapsed = time.perf_counter() - start
+    finally:
+        runner.teardown_databases(old_config)
+        cache_settings.disable()
+        directory.cleanup()
+
+    errors = sum(1 for status in statuses if status not in (200, 302))
+    return {
+        "profile": profile,
+        "requests": len(statuses),
+        "concurrency": concurrency,
+        "errors": errors,
+        "connections_opened": len(opened),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(statuses) / elapsed, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--postgres", action="store_true", help="Also run the postgres profile.")
+    parser.add_argument("--profile", choices=list(PROFILES), help="Run a single profile in this process.")
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(measure(args.profile, args.scale, args.requests, args.concurrency)))
+        sys.exit(0)
+
+    profiles = ["sqlite", "sqlite-tuned"] + (["postgres"] if args.postgres else [])
+    results = []
+    for profile in profiles:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.database", "--profile", profile, "--scale", str(args.scale),
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency)
+            ],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+
+    print(json.dumps(results, indent=4))
@@ -0,0 +1,154 @@
+"""
+Compare logged in browsing under each session storage (DJANGO_SESSION_STORAGE):
+cache, signed cookies and the database session table.
+
+    python -m benchmarks.sessions [--scale N] [--requests N] [--concurrency N]
+
+Each mode runs in its own process (the session engine is chosen when settings
+are loaded) against a throwaway database filled by benchmarks.data. Every
+worker thread browses as its own user and posts a comment now and then, so
+the POST, redirect and message round trip is part of the workload.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+MODES = ["db", "cache", "signed_cookies"]
+
+# One in this many requests posts a comment
+COMMENT_EVERY = 10
+
+
+def _workload(count, seed=0):
+    from django.urls import reverse
+
+    from auctions.models import Listing
+
+    rng = random.Random(seed)
+    listings = list(Listing.objects.values_list("pk", flat=True))
+    requests = []
+    for i in range(count):
+        listing = rng.choice(listings)
+        if i % COMMENT_EVERY == 0:
+            requests.append(("post", reverse("comment", kwargs={"id": listing}), {"title": "Title", "content": "Content"}))
+        else:
+            requests.append(("get", reverse("listing", kwargs={"id": listing}), {}))
+    return requests
+
+
+def _session_queries(client, requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    # Queries of the session table over the workload, on one thread
+    with CaptureQueriesContext(connection) as context:
+        for method, url, data in requests:
+            getattr(client, method)(url, data)
+    return sum(1 for query in context.captured_queries if "django_session" in query["sql"])
+
+
+def measure(mode, scale, requests, concurrency):
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+    os.environ["DJANGO_SESSION_STORAGE"] = mode
+    django.setup()
+
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.test import Client
+    from django.test.runner import DiscoverRunner
+
+    from auctions.models import User
+    from auctions.testing import isolated_caches
+    from benchmarks.data import generate
+
+    settings.ALLOWED_HOSTS = ["testserver"]
+
+    # Measure file-based sessions in a throwaway directory, not session_cache/
+    directory = tempfile.TemporaryDirectory()
+    cache_settings = isolated_caches(sessions={
+        "BACKEND": settings.CACHES["sessions"]["BACKEND"],
+        "LOCATION": directory.name,
+        "OPTIONS": settings.CACHES["sessions"].get("OPTIONS", {}),
+    })
+    cache_settings.enable()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        generate(scale)
+        caches["sessions"].clear()
+        workload = _workload(requests)
+
+        # One logged in client per worker thread
+        clients = []
+        for i in range(concurrency):
+            client = Client()
+            client.force_login(User.objects.create_user(f"benchmark{i}", "benchmark@example.com", "password"))
+            clients.append(client)
+
+        session_queries = _session_queries(clients[0], workload[:COMMENT_EVERY * 5])
+
+        def browse(worker):
+            statuses = []
+            for method, url, data in workload[worker::concurrency]:
+                try:
+                    statuses.append(getattr(clients[worker], method)(url, data).status_code)
+                except Exception:
+                    # E.g. "database is locked" under concurrent writes
+                    statuses.append(500)
+            return statuses
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            statuses = [status for result in executor.map(browse, range(concurrency)) for status in result]
+        elapsed = time.perf_counter() - start
+    finally:
+        runner.teardown_databases(old_config)
+        cache_settings.disable()
+        directory.cleanup()
+
+    errors = sum(1 for status in statuses if status not in (200, 302))
+    return {
+        "mode": mode,
+        "requests": len(statuses),
+        "concurrency": concurrency,
+        "errors": errors,
+        "session_queries_per_request": round(session_queries / (COMMENT_EVERY * 5), 2),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(statuses) / elapsed, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", choices=MODES, help="Run a single mode in this process.")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.scale, args.requests, args.concurrency)))
+        sys.exit(0)
+
+    results = []
+    for mode in MODES:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.sessions", "--mode", mode, "--scale", str(args.scale),
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency)
+            ],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+
+    print(json.dumps(results, indent=4))
@@ -0,0 +1,54 @@
+"""
+Measure process startup cost of the commerce project: wall time of
+django.setup() in fresh interpreters and the number of queries it runs.
+
+    python benchmarks/startup.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so import-time work is measured every time
+SETUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import django
+from django.conf import settings
+settings.DEBUG = True
+django.setup()
+from django.db import connection
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "queries": len(connection.queries)}))
+"""
+
+
+def measure(runs):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="commerce.settings")
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", SETUP_SCRIPT],
+            cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+
+    times = [result["seconds"] * 1000 for result in results]
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(times), 2),
+        "min_ms": round(min(times), 2),
+        "queries": results[-1]["queries"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(measure(args.runs), indent=4))
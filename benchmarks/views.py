@@ -0,0 +1,186 @@
+"""
+Benchmark latency and query counts of the hot auctions views.
+
+    python -m benchmarks.views [--scale N] [--iterations N] [--output FILE] [--compare FILE]
+
+Runs against a throwaway test database filled by benchmarks.data, writes the
+results as JSON and exits with status 1 if any view exceeds its query budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Maximum number of queries per request, including session and user lookups
+# and the savepoint statements of transactions (bid, close). Bids also look up
+# the top proxy bids of the listing.
+QUERY_BUDGETS = {
+    "index": 4,
+    "listing": 5,
+    "category": 4,
+    "watchlist": 4,
+    "dashboard": 4,
+    "bid": 8,
+    "close": 6,
+}
+
+
+def _requests(own_listings, listings, categories):
+    from django.urls import reverse
+
+    # Each view maps to a function returning (method, url, data) for iteration i
+    return {
+        "index": lambda i: ("get", reverse("index"), {}),
+        "listing": lambda i: ("get", reverse("listing", kwargs={"id": listings[i % len(listings)]}), {}),
+        "category": lambda i: ("get", reverse("category", kwargs={"category_id": categories[i % len(categories)]}), {}),
+        "watchlist": lambda i: ("get", reverse("watchlist"), {}),
+        "dashboard": lambda i: ("get", reverse("dashboard"), {}),
+        "bid": lambda i: ("post", reverse("bid", kwargs={"id": own_listings[0].pk}), {"bid_amount": 100000 + i}),
+        "close": lambda i: ("post", reverse("close", kwargs={"id": own_listings[i + 1].pk}), {}),
+    }
+
+
+def measure(client, request, iterations):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = []
+    for i in range(iterations):
+        method, url, data = request(i)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code not in (200, 302):
+            raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+        queries.append(len(context.captured_queries))
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_queries": max(queries),
+    }
+
+
+def run(iterations=20, views=None):
+    """
+    Measure views against the current database, which must contain data from
+    benchmarks.data. Requests are made by a fresh user who owns enough open
+    listings to bid on and close one per iteration.
+    """
+    from django.core.cache import cache
+    from django.test import Client
+
+    from auctions.models import User, Category, Listing, WatchlistItem
+
+    user = User.objects.create_user(f"benchmark{User.objects.count()}", "benchmark@example.com", "password")
+    listings = list(Listing.objects.order_by("pk").values_list("pk", flat=True))
+    categories = list(Category.objects.values_list("pk", flat=True))
+    own_listings = Listing.objects.bulk_create([
+        Listing(title=f"Benchmark {i}", description="Benchmark listing", seller=user, category_id=categories[0])
+        for i in range(iterations + 1)
+    ])
+    WatchlistItem.objects.bulk_create([WatchlistItem(user=user, listing_id=pk) for pk in listings[:10]])
+
+    cache.clear()
+    client = Client()
+    client.force_login(user)
+
+    requests = _requests(own_listings, listings, categories)
+    return {
+        name: measure(client, request, iterations)
+        for name, request in requests.items()
+        if views is None or name in views
+    }
+
+
+def over_budget(results):
+    return {
+        name: result["max_queries"]
+        for name, result in results.items()
+        if result["max_queries"] > QUERY_BUDGETS[name]
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def _compare(results, path):
+    with open(path) as f:
+        previous = json.load(f)["views"]
+
+    for name, result in results.items():
+        if name not in previous:
+            continue
+        before = previous[name]
+        print(
+            f"{name:<10} median {before['median_ms']:>8.3f} -> {result['median_ms']:>8.3f} ms, "
+            f"queries {before['max_queries']} -> {result['max_queries']}"
+        )
+
+
+if __name__ == "__main__":
+    import django
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Print changes against a previous JSON results file.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+    django.setup()
+
+    from django.test.runner import DiscoverRunner
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from auctions.testing import isolated_caches
+    from benchmarks.data import generate
+
+    # Throwaway database and caches so benchmarks never touch development data
+    setup_test_environment()
+    cache_settings = isolated_caches()
+    cache_settings.enable()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        generate(args.scale)
+        results = run(args.iterations)
+    finally:
+        runner.teardown_databases(old_config)
+        cache_settings.disable()
+        teardown_test_environment()
+
+    report = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "scale": args.scale,
+        "budgets": QUERY_BUDGETS,
+        "views": results,
+    }
+    print(json.dumps(report, indent=4))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        _compare(results, args.compare)
+
+    exceeded = over_budget(results)
+    for name, queries in exceeded.items():
+        print(f"{name} exceeded its query budget: {queries} > {QUERY_BUDGETS[name]}", file=sys.stderr)
+    sys.exit(1 if exceeded else 0)
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,6 +69,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'auctions.context_processors.watchlist_count',
             ],
         },
     },
@@ -77,6 +79,10 @@ CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 WSGI_APPLICATION = 'commerce.wsgi.application'
 
+# Runs the test suite with in-memory caches instead of the ones configured below
+
+TEST_RUNNER = 'auctions.testing.TestRunner'
+
 # Connect Bootstrap alerts to Django message tags
 MESSAGE_TAGS = {
         messages.DEBUG: 'alert-secondary',
@@ -87,15 +93,62 @@ MESSAGE_TAGS = {
  }
 
 
+# Serve read-only views with their async versions (auctions.async_views),
+# enabled by commerce.asgi
+
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
+
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+#
+# DJANGO_DB_ENGINE selects the database: sqlite (default) or postgres, the
+# latter configured by DJANGO_DB_NAME, DJANGO_DB_USER, DJANGO_DB_PASSWORD,
+# DJANGO_DB_HOST and DJANGO_DB_PORT.
+
+DATABASE_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite')
+
+SQLITE_TUNING = os.environ.get('DJANGO_SQLITE_TUNING', '1') == '1'
+
+if DATABASE_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'commerce'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'auctions.backends.sqlite3' if SQLITE_TUNING else 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
     }
-}
+
+# Seconds a connection is reused across requests (DJANGO_DB_CONN_MAX_AGE, 0
+# opens one per request), checked before reuse. Async views run their queries
+# in executor threads, which would each keep a connection open, so connections
+# are not reused by default under ASGI.
+
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 0 if ASYNC_VIEWS else 60))
+
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# SQLite tuning, DJANGO_SQLITE_TUNING=0 disables it. Pragmas are run on every
+# new connection by auctions.database: WAL lets readers continue during a
+# write, and writers wait for the lock instead of failing with "database is
+# locked". auctions.backends.sqlite3 takes that lock when a transaction begins,
+# so transactions reading before they write wait for it too.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+} if SQLITE_TUNING else {}
 
 AUTH_USER_MODEL = 'auctions.User'
 
@@ -136,3 +189,118 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Number of listings shown per page in listing feeds
+
+LISTINGS_PAGE_SIZE = 25
+
+# Number of comments shown at once on listing pages
+
+COMMENTS_PAGE_SIZE = 20
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# The default cache holds fragment versions, counters and aggregates that are
+# incremented in place and invalidated by the management commands
+# (close_expired_auctions, import_listings). DJANGO_CACHE_BACKEND selects it:
+#   locmem  memory of each process (default, single process development)
+#   redis   Redis at DJANGO_CACHE_LOCATION (requires redis), shared by all
+#           processes with atomic increments, needed with several processes
+
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+    }
+else:
+    DEFAULT_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+
+# Every write names its timeout, counters and versions are kept until evicted
+
+DEFAULT_CACHE['TIMEOUT'] = None
+
+CACHES = {
+    'default': DEFAULT_CACHE,
+    # Sessions outlive restarts and are shared by all processes of the host
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'session_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Seconds rendered listing page fragments stay cached
+
+LISTING_FRAGMENT_TIMEOUT = 300
+
+
+# Sessions
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/
+#
+# DJANGO_SESSION_STORAGE chooses where sessions are kept, so logged in page
+# views need not read (and write) the session table:
+#   cache           the 'sessions' cache (default)
+#   signed_cookies  the client's cookie, signed with SECRET_KEY
+#   db              the django_session table
+
+SESSION_STORAGE = os.environ.get('DJANGO_SESSION_STORAGE', 'cache')
+
+SESSION_ENGINE = {
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_STORAGE]
+
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Messages after POST redirects travel in a cookie and never modify the session
+
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
+# Full-text search backend (dotted path), chosen by database vendor if unset
+
+SEARCH_BACKEND = None
+
+SEARCH_RESULTS_LIMIT = 50
+
+
+# Fraction of requests whose timings and queries are recorded by
+# auctions.metrics.RequestMetricsMiddleware (0 disables it)
+
+REQUEST_METRICS_SAMPLE_RATE = 0
+
+
+# Broker fanning out live listing events (dotted path), in-process by default.
+# The in-process broker only reaches pages streamed by the publishing process,
+# so closes by the close_expired_auctions command (or events of other web
+# processes) need a cross-process broker, e.g. Redis pub/sub.
+
+EVENT_BROKER = 'auctions.events.InProcessBroker'
+
+
+# Thumbnails of listing images (auctions.images), fetched once per image and
+# served from this directory, least recently used evicted above the size limit
+
+IMAGE_CACHE_DIR = os.path.join(BASE_DIR, 'image_cache')
+
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+IMAGE_FETCH_TIMEOUT = 5
+
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+
+
+# Email backend of notifications sent by the send_notifications command,
+# printed to the console in development
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'